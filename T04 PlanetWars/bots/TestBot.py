@@ -7,7 +7,7 @@ class TestBot(object):
     if gameInfo.my_planets and gameInfo.not_my_planets:
       
       # All destinations that don't have a fleet going there yet
-      possibleDestinations = list(filter(lambda x: x.id not in map(lambda x: x.dest.id, gameInfo.my_fleets.values()), gameInfo.not_my_planets.values()))
+      possibleDestinations = list(filter(lambda x: x.id not in gameInfo.my_fleets_by_dest, gameInfo.not_my_planets.values()))
       
       if len(possibleDestinations) == 0:
         return
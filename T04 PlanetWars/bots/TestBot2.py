@@ -6,7 +6,7 @@ class TestBot2(object):
       
     if gameInfo.my_planets and gameInfo.not_my_planets:
       
-      possibleDestinations = list(filter(lambda x: x.id not in map(lambda x: x.dest.id, gameInfo.my_fleets.values()), gameInfo.not_my_planets.values()))
+      possibleDestinations = list(filter(lambda x: x.id not in gameInfo.my_fleets_by_dest, gameInfo.not_my_planets.values()))
       
       if len(possibleDestinations) == 0:
         return
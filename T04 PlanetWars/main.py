@@ -11,6 +11,8 @@ Updated 2015
 '''
 
 from planet_wars import PlanetWars
+from players import BotReloader
+from entities import NEUTRAL_ID
 
 from pyglet import window, clock, app, resource, sprite
 from pyglet.window import key
@@ -51,6 +53,11 @@ COLOR = {
     1: COLOR_NAMES['LIGHT_RED'],  # (255, 0, 0), # red
     2: COLOR_NAMES['LIGHT_BLUE'],  # (0, 0, 255), # blue
     3: COLOR_NAMES['LIGHT_GREEN'],  # (0, 255, 0), # green
+    4: COLOR_NAMES['YELLOW'],
+    5: COLOR_NAMES['AQUA'],
+    6: COLOR_NAMES['ORANGE'],
+    7: COLOR_NAMES['PURPLE'],
+    8: COLOR_NAMES['PINK'],
 }
 
 # todo: these should be based on data, not magic ...
@@ -152,6 +159,26 @@ class PlanetWarsScreenAdapter(object):
         for k, f in fleets.items():
             self.fleets[k] = self._fleet_stamp(f, f.num_ships)
 
+    def sync_changes(self, changes, label_type='num_ships'):
+        # update the cached (all view) details with just the changes of the
+        # last game update (see Changes) - restamp changed (or growing)
+        # planets, stamp new fleets, drop gone fleets and move the rest
+        for k, p in self.game.planets.items():
+            if k in changes.planets or (label_type == 'num_ships' and p.owner_id != NEUTRAL_ID):
+                self.planets[k] = self._planet_stamp(p, p.__getattribute__(label_type))
+
+        for k, f in changes.launched.items():
+            self.fleets[k] = self._fleet_stamp(f, f.num_ships)
+        for k in changes.gone:
+            self.fleets.pop(k, None)
+        for k, f in self.game.fleets.items():
+            if k in changes.fleets:
+                self.fleets[k] = self._fleet_stamp(f, f.num_ships)
+            elif k not in changes.launched:
+                stamp = self.fleets[k]
+                stamp.pos = self.game_to_screen(f.x, f.y)
+                stamp.label.x, stamp.label.y = stamp.pos
+
     def _planet_stamp(self, planet, value):
         pos = self.game_to_screen(planet.x, planet.y)
         radius = (self.ratio * PLANET_MIN_R) + ((PLANET_FACTOR * self.ratio) * planet.growth_rate)
@@ -187,6 +214,8 @@ class PlanetWarsWindow(window.Window):
         for p in players:
             self.game.add_player(p)
         self.max_tick = kwargs.pop('max_game_length')
+        # edited bots are reloaded (on the next step), keeping the game going
+        self.reloader = BotReloader(self.game.players.values())
 
         # set and use pyglet window settings
         kwargs.update({
@@ -239,8 +268,12 @@ class PlanetWarsWindow(window.Window):
         game = self.game
         if game:
             if not self.paused:
-                game.update()
-                self.adaptor.sync_all()
+                self.reloader.check()
+                changes = game.update()
+                if self.view_id == 0:
+                    self.adaptor.sync_changes(changes, self.label_type)
+                else:
+                    self.adaptor.sync_all(self.view_id, self.label_type)
 
             # update step label
             msg = 'Step:' + str(game.tick)
@@ -291,6 +324,7 @@ class PlanetWarsWindow(window.Window):
                 self.reset_space()
             # Do one step
             elif symbol == key.N:
+                self.reloader.check()
                 self.game.update()
             # Pause toggle?
             elif symbol == key.P:
@@ -0,0 +1,13 @@
+''' Fog-of-war belief tracking for PlanetWars players.
+
+    This is the `planetwars.beliefs` module of the shared PlanetWars core
+    package (../planetwars), kept here so `import beliefs` works as before.
+'''
+import os
+import sys
+from importlib import import_module
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+sys.modules[__name__] = import_module('planetwars.beliefs')
@@ -31,6 +31,32 @@ A gameinfo instance has various (possibly useful) dict's for you to use:
     enemy_planets
     enemy_fleets
 
+There are also some handy derived details, worked out (once per step) only if
+you ask for them:
+
+    # dict's of {planet_id: [fleets]} grouped by fleet destination
+    fleets_by_dest
+    my_fleets_by_dest
+    enemy_fleets_by_dest
+
+    # dict's of {planet_id: total ships} of fleets heading to each planet
+    my_incoming_ships
+    enemy_incoming_ships
+
+    # dict of {planet_id: planet} of your planet closest to each planet
+    nearest_my_planet
+
+    # dict of {planet_id: Estimate(owner_id, num_ships)} of the likely state of
+    # every planet, with planets out of view projected from when last seen
+    estimates
+
+    # dict of {fleet_id: fleet} of fleets gone out of view (still flying)
+    ghost_fleets
+
+    # dict of {planet_id: {planet_id: distance}} between all planets (this
+    # is worked out once per map, so is cheaper than planet.distance_to)
+    distances
+
 You issue orders from your bot using the methods of the gameinfo instance. 
 
     gameinfo.planet_order(src, dest, ships)
@@ -39,6 +65,12 @@ You issue orders from your bot using the methods of the gameinfo instance.
 For example, to send 10 ships from planet src to planet dest, you would
 say `gameinfo.planet_order(src, dest, 10)`.
 
+If the game has an opening book (see opening_book.py), the best recorded
+opening orders for the map and your seat can be issued for you in the first
+few ticks. It returns True if it did, so you can skip your own planning.
+
+    gameinfo.play_opening()
+
 There is also a player specific log if you want to leave a message
 
     gameinfo.log("Here's a message from the bot")
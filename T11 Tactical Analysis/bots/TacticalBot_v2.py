@@ -1,5 +1,9 @@
 class TacticalBot_v2 (object):
 
+    # Tunable parameters (can be set per game, see sweep.py)
+    defensive_buffer = 0
+    max_distance = 10
+
     def update(self, gameInfo):
 
         if not gameInfo.my_planets or not gameInfo.not_my_planets:
@@ -25,7 +29,7 @@ class TacticalBot_v2 (object):
             # Fleet is capturing a neutral planet or reinforcing an enemy planet, adjust the number of ships needed to capture it
             planet_details[enemy_fleet.dest.id]['ships_required'] += enemy_fleet.num_ships
 
-        defensive_buffer = 0
+        defensive_buffer = self.defensive_buffer
 
         # Get list of all my planets that could send ships to attack or defend (leaving at least 10 ships at home)
         my_available_planets = list(filter(lambda planet: planet['owner'] == 'me' and planet['ships_required'] + defensive_buffer < planet['ships_current'], planet_details.values()))
@@ -41,7 +45,7 @@ class TacticalBot_v2 (object):
                 'required': my_planet['ships_required'] - my_planet['ships_current']
             })
 
-        max_distance = 10
+        max_distance = self.max_distance
 
         # Sort the requests by the number of ships required, lowest to highest
         defensive_fleets_requested = sorted(fleets_requested, key = lambda request: request['required'], reverse = True)
@@ -1,5 +1,8 @@
 class TacticalBot_v3 (object):
 
+    # Tunable parameters (can be set per game, see sweep.py)
+    max_distance = 10
+
     # TODO: TacticalBot_v4 needs to take into account the fleets we've already sent, so that we don't double up
 
     def update(self, gameInfo):
@@ -84,7 +87,7 @@ class TacticalBot_v3 (object):
 
     def send_fleets(self, gameInfo, requests, available_planets):
 
-        max_distance = 10
+        max_distance = self.max_distance
 
         # Attempt to match each request to a planet with sufficient ships to launch a fleet
         for request in requests:
@@ -1,5 +1,8 @@
 class TacticalBot_v4 (object):
 
+    # Tunable parameters (can be set per game, see sweep.py)
+    extra_ships = 1
+
     # TODO: TacticalBot_v4 needs to take into account the fleets we've already sent, so that we don't double up
 
     def update(self, gameInfo):
@@ -7,6 +10,10 @@ class TacticalBot_v4 (object):
         if not gameInfo.my_planets or not gameInfo.not_my_planets:
             return
 
+        # Play the opening book line (if the game has one), no planning needed
+        if gameInfo.play_opening():
+            return
+
         # Record the current and required ships for each planet
         planet_details = {}
         for planet_id, planet in gameInfo.planets.items():
@@ -92,7 +99,7 @@ class TacticalBot_v4 (object):
                     available_planet['ships_current'] - \
                     available_planet['ships_required']
 
-                required_ships = request['required'] + 1
+                required_ships = request['required'] + self.extra_ships
 
                 if request['planet']['ID'] in gameInfo.enemy_planets:
                     # Calculate how many enemy ships will be created in the time it takes our fleet to reach the destination
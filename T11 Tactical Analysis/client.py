@@ -0,0 +1,104 @@
+''' Connect a PlanetWars bot to a game server (see server.py).
+
+The client keeps its own copy of the player's view of the game, updated from
+the delta "view" messages of the server, and runs the bot controller (loaded
+by name from the bots directory, as usual) with it each tick. The orders the
+bot issues are sent back to the server.
+
+Usage (from this directory):
+
+    python client.py TacticalBot_v4 --port 7777
+    python client.py TestBot --game 12 --count 50   # fifty bots, one connection each
+
+'''
+import json
+import asyncio
+
+from entities import Clock, Fleet, Planet
+from players import Player
+
+
+class RemoteView(object):
+
+    ''' Applies "view" deltas from the server to a local `Player` instance. '''
+
+    def __init__(self, player):
+        self.player = player
+        self.in_view = {}  # {planet_id: in_view} as last sent
+        self.clock = Clock()  # (known fleets move as the clock advances)
+
+    def apply(self, msg):
+        planets = self.player.planets
+        fleets = self.player.fleets
+        for k, (x, y, owner_id, num_ships, growth_rate, in_view) in msg['planets'].items():
+            k = int(k)
+            if k not in planets:
+                planets[k] = Planet(x, y, k, owner_id, num_ships, growth_rate)
+            p = planets[k]
+            p.owner_id, p.num_ships = owner_id, num_ships
+            self.in_view[k] = in_view
+        # planets out of view keep their old details, but get older
+        for k, p in planets.items():
+            p.vision_age = 0 if self.in_view[k] else p.vision_age + 1
+        for k in msg['gone']:
+            fleets.pop(k, None)
+        # new (or changed) fleets are replaced
+        self.clock.tick = msg['tick']
+        for k, (owner_id, num_ships, src_x, src_y, dest_id, turns_remaining, x, y) in msg['fleets'].items():
+            src = Planet(src_x, src_y, None, owner_id, 0, 0)
+            progress = src.distance_to(planets[dest_id]) - turns_remaining
+            fleets[k] = Fleet(k, owner_id, num_ships, src, planets[dest_id], progress, self.clock)
+        self.player.tick = msg['tick']
+        self.player.refresh_gameinfo()
+
+
+async def play(bot, host='localhost', port=7777, path=None, game=None, log=print):
+    ''' Play one game on the server with the named bot. Returns the winner id. '''
+    if path:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    writer.write((json.dumps({'type': 'play', 'game': game}) + '\n').encode())
+    view = None
+    winner = None
+    async for line in reader:
+        msg = json.loads(line)
+        if msg['type'] == 'start':
+            player = Player(msg['player_id'], bot, None, None, None)
+            view = RemoteView(player)
+        elif msg['type'] == 'view':
+            view.apply(msg)
+            player.update()
+            orders = [[kind, str(src_id) if kind == 'fleet' else src_id, dest_id, num_ships]
+                      for kind, src_id, new_id, num_ships, dest_id in player.orders]
+            player.orders[:] = []
+            writer.write((json.dumps({'type': 'orders', 'tick': msg['tick'],
+                                      'orders': orders}) + '\n').encode())
+            await writer.drain()
+        elif msg['type'] == 'end':
+            winner = msg['winner']
+            break
+        elif msg['type'] == 'error':
+            log('Error: %s' % msg['message'])
+            break
+    writer.close()
+    return winner
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Play a bot on a PlanetWars server.')
+    parser.add_argument('bot')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--unix', help='connect to a Unix socket path instead')
+    parser.add_argument('--game', type=int, default=None)
+    parser.add_argument('--count', type=int, default=1, help='number of bots to connect')
+    args = parser.parse_args()
+
+    async def main():
+        results = await asyncio.gather(*[play(args.bot, args.host, args.port, args.unix, args.game)
+                                         for i in range(args.count)])
+        print('Winners:', results)
+
+    asyncio.run(main())
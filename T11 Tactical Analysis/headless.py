@@ -0,0 +1,68 @@
+''' Headless PlanetWars match runner.
+
+Plays a complete PlanetWars match without a pyglet window, so that tools which
+need to play a lot of games (ladders, parameter sweeps etc) can do so quickly
+and in worker processes.
+
+A match is described by the map file and the list of bot names, in seat order
+(seat 1 is player id 1, "Red" in the GUI). The result is a `GameResult` with
+the winning seat (0 if no winner was decided before `max_game_length`), the
+number of ticks played, the number of ships each seat had at the end and (if
+asked for) the opening orders of each seat, for an opening book, and the
+per-tick metrics columns (see metrics.py).
+
+'''
+import random
+from collections import namedtuple
+
+from planet_wars import PlanetWars
+from logger import Logger
+from opening_book import OpeningRecorder
+from metrics import TickMetrics
+
+GameResult = namedtuple('GameResult', 'winner ticks ships openings metrics',
+                        defaults=(None, None))
+
+
+def load_map(map_name):
+    ''' Return the gamestate text for a map, by name ("map5") or path. '''
+    filename = map_name if map_name.endswith('.txt') else './maps/%s.txt' % map_name
+    with open(filename) as f:
+        return f.read()
+
+
+def play_game(gamestate, players, max_game_length=500, logger=None,
+              params=None, seed=None, book=None, opening_ticks=0, metrics=False):
+    ''' Play a single game to completion. `players` is a list of bot names in
+        seat order, and `params` an optional list (in the same order) of
+        parameter dicts for each bot. If a `seed` is given, the random module
+        is seeded with it first (for bots that use random choices). Bots are
+        given lines from the opening `book` (if any), and the planet orders of
+        the first `opening_ticks` ticks are recorded in the result, as are
+        the per-tick `metrics` (if True). Returns a `GameResult`.
+    '''
+    if seed is not None:
+        random.seed(seed)
+    tick_metrics = TickMetrics() if metrics else None
+    game = PlanetWars(gamestate, logger=logger or Logger('./logs/%s.log'), book=book,
+                      metrics=tick_metrics)
+    for name, bot_params in zip(players, params or [None] * len(players)):
+        game.add_player(name, params=bot_params)
+    recorder = OpeningRecorder(opening_ticks)
+    game.reset()
+    while game.is_alive() and game.tick < max_game_length:
+        recorder.add(game.update())
+    winner = game.winner.id if game.winner else 0
+    ships = tuple(game.players[i].num_ships for i in sorted(game.players))
+    openings = dict(recorder.lines) if opening_ticks else None
+    columns = tick_metrics.columns if metrics else None
+    return GameResult(winner, game.tick, ships, openings, columns)
+
+
+def play_match(match):
+    ''' Process pool friendly wrapper of `play_game`. The match is a tuple of
+        (map_name, players, max_game_length), optionally followed by the
+        `params`, `seed`, `book`, `opening_ticks` and `metrics` arguments.
+    '''
+    map_name, players, max_game_length = match[:3]
+    return play_game(load_map(map_name), players, max_game_length, None, *match[3:])
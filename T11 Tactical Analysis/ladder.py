@@ -0,0 +1,333 @@
+''' PlanetWars bot ladder, with TrueSkill ratings and incremental evaluation.
+
+Every game played is kept in a SQLite database, one row per game, keyed by the
+bot *version* in each seat and the map it was played on. A bot version is the
+bot name plus a hash of its source file, so editing `TacticalBot_v4.py` (or
+adding a new `TacticalBot_v5.py`) creates a new version that starts with an
+uncertain rating, while the games of every unchanged bot are kept.
+
+Ratings are not stored. They are rebuilt by replaying the stored results of
+the current bot versions (which is cheap compared to playing games). Only the
+games needed to bring each bot's rating uncertainty (sigma) below a threshold
+are scheduled, and these are played by a pool of headless worker processes.
+So adding one new bot only schedules games for that bot, not a whole new
+round-robin tournament. The opening orders of ladder games can also be
+recorded in an opening book (see opening_book.py), and the best lines of the
+book given to the bots of later games (only the lines each bot version
+played itself, so the ratings are still of the bots), and the results and
+per-tick metrics of the games exported to columnar files (see metrics.py).
+
+Usage (from this directory):
+
+    python ladder.py                                # all bots in ./bots
+    python ladder.py TestBot TacticalBot_v4         # just these bots
+    python ladder.py --threshold 1.5 --workers 8    # more certain, faster
+    python ladder.py --book ./logs/openings.db      # and record openings
+    python ladder.py --book ./logs/openings.db --play-book  # and play them
+    python ladder.py --metrics ./logs/metrics       # and export metrics
+
+'''
+import os
+import sqlite3
+import hashlib
+from math import sqrt
+from statistics import NormalDist
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from headless import play_match, load_map
+from opening_book import OpeningBook, map_hash
+from metrics import ColumnWriter, TICK_COLUMNS, GAME_COLUMNS
+
+DB_PATH = './logs/ladder.db'
+BOTS_DIR = './bots'
+MAPS_DIR = './maps'
+
+# TrueSkill defaults (see Herbrich, Minka and Graepel, 2007)
+MU = 25.0
+SIGMA = MU / 3
+BETA = SIGMA / 2
+TAU = SIGMA / 100
+DRAW_PROBABILITY = 0.10
+
+_NORMAL = NormalDist()
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS bots (
+        version TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        hash TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS games (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        map TEXT NOT NULL,
+        red TEXT NOT NULL,   -- seat 1 bot version
+        blue TEXT NOT NULL,  -- seat 2 bot version
+        winner INTEGER NOT NULL,  -- winning seat, 0 for a draw
+        ticks INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS games_red ON games (red, map);
+    CREATE INDEX IF NOT EXISTS games_blue ON games (blue, map);
+'''
+
+
+class Rating(object):
+    ''' A TrueSkill rating - the belief of a bot's skill as a normal
+        distribution with mean `mu` and standard deviation `sigma`.
+    '''
+
+    def __init__(self, mu=MU, sigma=SIGMA):
+        self.mu = mu
+        self.sigma = sigma
+        self.games = 0
+
+    def exposure(self):
+        ''' A conservative skill estimate, used to order the ladder. '''
+        return self.mu - 3 * self.sigma
+
+    def __str__(self):
+        return "%6.2f +/- %5.2f" % (self.mu, self.sigma)
+
+
+def _draw_margin(draw_probability=DRAW_PROBABILITY, beta=BETA):
+    return _NORMAL.inv_cdf((draw_probability + 1) / 2.0) * sqrt(2) * beta
+
+
+def _v_win(t, e):
+    denom = _NORMAL.cdf(t - e)
+    return _NORMAL.pdf(t - e) / denom if denom > 1e-12 else e - t
+
+
+def _w_win(t, e):
+    v = _v_win(t, e)
+    return v * (v + t - e)
+
+
+def _v_draw(t, e):
+    a, b = e - abs(t), -e - abs(t)
+    denom = _NORMAL.cdf(a) - _NORMAL.cdf(b)
+    v = (_NORMAL.pdf(b) - _NORMAL.pdf(a)) / denom if denom > 1e-12 else a
+    return -v if t < 0 else v
+
+
+def _w_draw(t, e):
+    a, b = e - abs(t), -e - abs(t)
+    denom = _NORMAL.cdf(a) - _NORMAL.cdf(b)
+    if denom <= 1e-12:
+        return 1.0
+    v = _v_draw(abs(t), e)
+    return v * v + (a * _NORMAL.pdf(a) - b * _NORMAL.pdf(b)) / denom
+
+
+def rate_1vs1(winner, loser, drawn=False):
+    ''' Update (in place) the two ratings after a game. If `drawn` the order
+        of `winner` and `loser` does not matter.
+    '''
+    sigma2_w = winner.sigma ** 2 + TAU ** 2
+    sigma2_l = loser.sigma ** 2 + TAU ** 2
+    c2 = 2 * BETA ** 2 + sigma2_w + sigma2_l
+    c = sqrt(c2)
+    t = (winner.mu - loser.mu) / c
+    e = _draw_margin() / c
+    if drawn:
+        v, w = _v_draw(t, e), _w_draw(t, e)
+    else:
+        v, w = _v_win(t, e), _w_win(t, e)
+    winner.mu += sigma2_w / c * v
+    loser.mu -= sigma2_l / c * v
+    winner.sigma = sqrt(sigma2_w * max(1 - sigma2_w / c2 * w, 1e-4))
+    loser.sigma = sqrt(sigma2_l * max(1 - sigma2_l / c2 * w, 1e-4))
+    winner.games += 1
+    loser.games += 1
+
+
+def bot_names():
+    ''' All bot names (modules) in the bots directory. '''
+    return sorted(f[:-3] for f in os.listdir(BOTS_DIR)
+                  if f.endswith('.py') and not f.startswith('_'))
+
+
+def map_names():
+    ''' All map names in the maps directory, in numeric order. '''
+    names = [f[:-4] for f in os.listdir(MAPS_DIR) if f.endswith('.txt')]
+    return sorted(names, key=lambda n: (len(n), n))
+
+
+def bot_version(name):
+    ''' Version id of a bot, which changes whenever its source changes. '''
+    with open(os.path.join(BOTS_DIR, name + '.py'), 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:10]
+    return '%s@%s' % (name, digest), digest
+
+
+class Ladder(object):
+
+    ''' The persistent ladder of bot versions and their game results. Use
+        `run` to play just enough games to settle the ratings of the given bots.
+    '''
+
+    def __init__(self, db_path=DB_PATH, maps=None, max_game_length=500, book=None,
+                 metrics=None, play_book=False):
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(SCHEMA)
+        self.maps = maps or map_names()
+        self.max_game_length = max_game_length
+        self.book = book  # (optional) OpeningBook to record openings in
+        self.play_book = play_book  # and give its lines to the bots?
+        self.metrics = metrics  # (optional) path to export game metrics to
+
+    def register(self, name):
+        ''' Add the current version of the named bot (if new), return its id. '''
+        version, digest = bot_version(name)
+        with self.db:
+            self.db.execute('INSERT OR IGNORE INTO bots VALUES (?, ?, ?)',
+                            (version, name, digest))
+        return version
+
+    def games(self, versions):
+        ''' All stored (map, red, blue, winner) results between the versions. '''
+        marks = ','.join('?' * len(versions))
+        sql = 'SELECT map, red, blue, winner FROM games ' \
+              'WHERE red IN (%s) AND blue IN (%s) ORDER BY id' % (marks, marks)
+        return self.db.execute(sql, list(versions) * 2).fetchall()
+
+    def ratings(self, versions):
+        ''' Rebuild the ratings of the versions from the stored results. '''
+        ratings = {v: Rating() for v in versions}
+        for map_name, red, blue, winner in self.games(versions):
+            if winner == 2:
+                rate_1vs1(ratings[blue], ratings[red])
+            else:
+                rate_1vs1(ratings[red], ratings[blue], drawn=(winner == 0))
+        return ratings
+
+    def schedule(self, versions, ratings, threshold, games_per_bot=4):
+        ''' Return a batch of matches (map, red, blue) for the versions whose
+            rating sigma is still above the threshold. Opponents are chosen
+            for information (fewest games played against, closest skill), then
+            the least played map and seat for that pairing.
+        '''
+        pair_games = defaultdict(int)  # (a, b) -> number of games
+        seat_games = defaultdict(int)  # (a, b, map, a_seat) -> number of games
+        map_games = defaultdict(int)  # (a, map) -> number of games
+
+        def count(map_name, red, blue):
+            pair_games[red, blue] += 1
+            pair_games[blue, red] += 1
+            seat_games[red, blue, map_name, 1] += 1
+            seat_games[blue, red, map_name, 2] += 1
+            map_games[red, map_name] += 1
+            map_games[blue, map_name] += 1
+
+        for map_name, red, blue, winner in self.games(versions):
+            count(map_name, red, blue)
+
+        matches = []
+        uncertain = [v for v in versions if ratings[v].sigma > threshold]
+        uncertain.sort(key=lambda v: -ratings[v].sigma)
+        for v in uncertain:
+            opponents = [o for o in versions if o != v]
+            for i in range(games_per_bot):
+                if not opponents:
+                    break
+                o = min(opponents, key=lambda o: (pair_games[v, o],
+                                                   abs(ratings[v].mu - ratings[o].mu)))
+                map_name, seat = min(((m, s) for m in self.maps for s in (1, 2)),
+                                     key=lambda ms: (seat_games[v, o, ms[0], ms[1]],
+                                                     map_games[v, ms[0]]))
+                red, blue = (v, o) if seat == 1 else (o, v)
+                matches.append((map_name, red, blue))
+                count(map_name, red, blue)
+        return matches
+
+    def record(self, map_name, red, blue, result):
+        ''' Store the (headless) `GameResult` of a match. Returns the game id. '''
+        with self.db:
+            cursor = self.db.execute('INSERT INTO games (map, red, blue, winner, ticks) '
+                                     'VALUES (?, ?, ?, ?, ?)',
+                                     (map_name, red, blue, result.winner, result.ticks))
+        if self.book and result.openings:
+            key = map_hash(load_map(map_name))
+            for seat, version in ((1, red), (2, blue)):
+                points = 0.5 if result.winner == 0 else float(result.winner == seat)
+                self.book.add(key, seat, result.openings.get(seat, []), points, version)
+        return cursor.lastrowid
+
+    def run(self, names, threshold=2.0, workers=None, max_games=1000, log=print):
+        ''' Play (in parallel) the games needed to bring the rating sigma of
+            every named bot below the threshold, or until `max_games` have
+            been played. Returns the final {version: Rating} dict.
+        '''
+        versions = [self.register(name) for name in names]
+        if self.book:
+            # (bots are only served the lines their own version played)
+            self.book.versions = {v.split('@')[0]: v for v in versions}
+        ratings = self.ratings(versions)
+        played = 0
+        if self.metrics:
+            ticks = ColumnWriter(self.metrics + '-ticks', TICK_COLUMNS)
+            games = ColumnWriter(self.metrics + '-games', GAME_COLUMNS)
+        try:
+            with ProcessPoolExecutor(workers) as pool:
+                while played < max_games:
+                    matches = self.schedule(versions, ratings, threshold)[:max_games - played]
+                    if not matches:
+                        break
+                    log('Playing %d games ...' % len(matches))
+                    opening_ticks = self.book.ticks if self.book else 0
+                    book = self.book if self.play_book else None
+                    jobs = [(m, [red.split('@')[0], blue.split('@')[0]], self.max_game_length,
+                             None, None, book, opening_ticks, bool(self.metrics))
+                            for m, red, blue in matches]
+                    for (m, red, blue), result in zip(matches, pool.map(play_match, jobs)):
+                        game_id = self.record(m, red, blue, result)
+                        if self.metrics:
+                            ticks.write(result.metrics, game=game_id)
+                            games.write({'map': [m], 'red': [red], 'blue': [blue],
+                                         'winner': [result.winner], 'ticks': [result.ticks]},
+                                        game=game_id)
+                    played += len(matches)
+                    ratings = self.ratings(versions)
+        finally:
+            if self.metrics:
+                ticks.close()
+                games.close()
+        log('%d new games played.' % played)
+        return ratings
+
+    def report(self, ratings):
+        ''' Pretty-format the ladder, best (most conservative skill) first. '''
+        lines = ['%-4s %-32s %-17s %s' % ('Rank', 'Bot', 'Rating', 'Games')]
+        ordered = sorted(ratings.items(), key=lambda vr: -vr[1].exposure())
+        for i, (version, r) in enumerate(ordered):
+            lines.append('%-4d %-32s %s %5d' % (i + 1, version, r, r.games))
+        return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Rate PlanetWars bots.')
+    parser.add_argument('bots', nargs='*', help='bot names (default: all bots)')
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--maps', nargs='*', help='map names (default: all maps)')
+    parser.add_argument('--threshold', type=float, default=2.0,
+                        help='rate bots until sigma is below this value')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-games', type=int, default=1000)
+    parser.add_argument('--max-game-length', type=int, default=500)
+    parser.add_argument('--book', help='record game openings in this opening book db')
+    parser.add_argument('--play-book', action='store_true',
+                        help='give bots the best lines of the opening book')
+    parser.add_argument('--metrics', help='export game results and metrics to this path')
+    args = parser.parse_args()
+    if args.play_book and not args.book:
+        parser.error('--play-book needs a --book')
+
+    book = OpeningBook(args.book) if args.book else None
+    ladder = Ladder(args.db, args.maps, args.max_game_length, book, args.metrics,
+                    args.play_book)
+    ratings = ladder.run(args.bots or bot_names(), args.threshold,
+                         args.workers, args.max_games)
+    print(ladder.report(ratings))
@@ -0,0 +1,189 @@
+''' Columnar per-tick metrics and game results for PlanetWars.
+
+A `TickMetrics` instance given to a `PlanetWars` game records, after each
+update, one row per player of:
+
+ - ships: total ships (on planets and in fleets)
+ - planets: number of planets owned
+ - fleets: number of fleets in flight
+ - fleet_ships: ships in fleets
+ - production: total growth rate of the planets owned
+
+The rows of a game are kept (in memory) as columns (lists) until the game
+ends, then a `ColumnWriter` streams the rows of many games to disk in chunks
+of rows, so that thousands of games can be analysed without parsing the text
+logs. If pyarrow is installed the metrics are a directory of Parquet files
+(one per run, with one row group per chunk), otherwise a directory of NumPy
+.npz files (one per chunk). Each run of a writer adds its own uniquely named
+files, so the metrics of an (incremental) ladder run are added to those of
+the earlier runs, rather than replacing them.
+
+To record metrics of ladder games (the ladder game id is the "game" column):
+
+    python ladder.py --metrics ./logs/metrics
+
+which adds to ./logs/metrics-ticks and ./logs/metrics-games (.parquet, or
+.npz, directories). To analyse them:
+
+    from metrics import load
+    ticks = load('./logs/metrics-ticks')  # {column: array}
+    ticks['ships'][ticks['player'] == 1].mean()
+
+'''
+import os
+import time
+import uuid
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+CHUNK_ROWS = 8192
+
+TICK_COLUMNS = [
+    ('game', 'int64'),
+    ('tick', 'int32'),
+    ('player', 'int32'),
+    ('ships', 'float64'),
+    ('planets', 'int32'),
+    ('fleets', 'int32'),
+    ('fleet_ships', 'float64'),
+    ('production', 'int32'),
+]
+
+GAME_COLUMNS = [
+    ('game', 'int64'),
+    ('map', 'str'),
+    ('red', 'str'),
+    ('blue', 'str'),
+    ('winner', 'int32'),
+    ('ticks', 'int32'),
+]
+
+
+class TickMetrics(object):
+
+    ''' Records per-tick, per-player metrics of a game (see `PlanetWars`) as
+        a dict of {column: [values]}. The whole game is kept in memory, to be
+        written (see `ColumnWriter`) when it ends. (The "game" column is left
+        for the writer to fill in.)
+    '''
+
+    def __init__(self):
+        self.columns = {name: [] for name, kind in TICK_COLUMNS if name != 'game'}
+
+    def record(self, game):
+        ships = dict.fromkeys(game.players, 0)
+        planets = dict.fromkeys(game.players, 0)
+        production = dict.fromkeys(game.players, 0)
+        fleets = dict.fromkeys(game.players, 0)
+        fleet_ships = dict.fromkeys(game.players, 0)
+        for p in game.planets.values():
+            if p.owner_id in ships:
+                ships[p.owner_id] += p.num_ships
+                planets[p.owner_id] += 1
+                production[p.owner_id] += p.growth_rate
+        for f in game.fleets.values():
+            fleets[f.owner_id] += 1
+            fleet_ships[f.owner_id] += f.num_ships
+        columns = self.columns
+        for player_id in game.players:
+            columns['tick'].append(game.tick)
+            columns['player'].append(player_id)
+            columns['ships'].append(ships[player_id] + fleet_ships[player_id])
+            columns['planets'].append(planets[player_id])
+            columns['fleets'].append(fleets[player_id])
+            columns['fleet_ships'].append(fleet_ships[player_id])
+            columns['production'].append(production[player_id])
+
+
+class ColumnWriter(object):
+
+    ''' Streams rows of the given (name, type) columns to `path`, in chunks of
+        `chunk_rows` rows. The format is "parquet" (a path.parquet directory,
+        with one file per run) if pyarrow is installed, else "npz" (a path
+        directory of .npz chunks). File names start with a (time ordered)
+        run id, so earlier runs are kept. Types are "int32", "int64",
+        "float64" or "str".
+    '''
+
+    def __init__(self, path, columns, chunk_rows=CHUNK_ROWS, format=None):
+        self.format = format or ('parquet' if pyarrow else 'npz')
+        if self.format == 'parquet' and pyarrow is None:
+            raise ImportError("Parquet metrics need pyarrow installed.")
+        if self.format == 'npz' and numpy is None:
+            raise ImportError("Metrics need pyarrow or numpy installed.")
+        self.path = path + '.parquet' if self.format == 'parquet' else path
+        self.types = dict(columns)
+        self.chunk_rows = chunk_rows
+        self._rows = {name: [] for name, kind in columns}
+        self._count = 0
+        self._chunks = 0
+        self._writer = None
+        self.run = '%s-%s' % (time.strftime('%Y%m%d-%H%M%S'), uuid.uuid4().hex[:8])
+        os.makedirs(self.path, exist_ok=True)
+
+    def write(self, columns, **constants):
+        ''' Append rows, given as a dict of {column: [values]} (all the same
+            length). Any columns given as `constants` are the same for all.
+        '''
+        rows = len(next(iter(columns.values())))
+        for name, values in self._rows.items():
+            values.extend(columns[name] if name in columns else [constants[name]] * rows)
+        self._count += rows
+        while self._count >= self.chunk_rows:
+            self._flush(self.chunk_rows)
+
+    def close(self):
+        if self._count:
+            self._flush(self._count)
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    def _flush(self, rows):
+        chunk = {}
+        for name, values in self._rows.items():
+            chunk[name] = values[:rows]
+            del values[:rows]
+        self._count -= rows
+        if self.format == 'parquet':
+            types = {'int32': pyarrow.int32(), 'int64': pyarrow.int64(),
+                     'float64': pyarrow.float64(), 'str': pyarrow.string()}
+            table = pyarrow.table({name: pyarrow.array(values, types[self.types[name]])
+                                   for name, values in chunk.items()})
+            if self._writer is None:
+                self._writer = pyarrow.parquet.ParquetWriter(
+                    os.path.join(self.path, self.run + '.parquet'), table.schema)
+            self._writer.write_table(table)
+        else:
+            arrays = {name: numpy.asarray(values, numpy.str_ if self.types[name] == 'str'
+                                          else self.types[name])
+                      for name, values in chunk.items()}
+            numpy.savez(os.path.join(self.path, '%s-%06d.npz' % (self.run, self._chunks)), **arrays)
+        self._chunks += 1
+
+
+def load(path):
+    ''' Load metrics (written by a `ColumnWriter`, in any number of runs) as
+        {column: array}. Parquet files are memory-mapped (and the columns are
+        numpy arrays if numpy is installed, else pyarrow arrays), npz chunks
+        are joined (in the order they were written).
+    '''
+    if os.path.exists(path + '.parquet'):
+        table = pyarrow.parquet.read_table(path + '.parquet', memory_map=True)
+        if numpy is None:
+            return {name: table.column(name) for name in table.column_names}
+        return {name: table.column(name).to_numpy() for name in table.column_names}
+    chunks = [numpy.load(os.path.join(path, name))
+              for name in sorted(os.listdir(path)) if name.endswith('.npz')]
+    if not chunks:
+        return {}
+    return {name: numpy.concatenate([c[name] for c in chunks]) for name in chunks[0].files}
@@ -0,0 +1,177 @@
+''' Opening book for PlanetWars maps.
+
+The first few ticks of a game are played the same way by most bots (and on a
+given map and seat the other players are usually still out of sight), so the
+same opening orders are worked out again every game. An opening book records
+the planet orders each seat actually launched in the first `ticks` ticks of
+(tournament) games, with the results, keyed by the map (a hash of its text),
+seat and bot version. The line with the best results can then be given to a
+bot, which can play it instead of planning:
+
+    def update(self, gameinfo):
+        if gameinfo.play_opening():
+            return  # orders were issued from the book
+        ...
+
+Lines are kept in a SQLite database as compact JSON lists of
+[tick, src_id, dest_id, num_ships] orders. To record lines from ladder games
+use `python ladder.py --book ./logs/openings.db` (add `--play-book` to also
+give the bots the best lines), and to list the best lines:
+
+    python opening_book.py
+    python opening_book.py --map map5
+
+'''
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+from collections import defaultdict
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+from entities import Planet
+from planetwars.maps import map_hash
+
+BOOK_PATH = './logs/openings.db'
+OPENING_TICKS = 10
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS lines (
+        map_hash TEXT NOT NULL,
+        seat INTEGER NOT NULL,
+        line_hash TEXT NOT NULL,
+        line TEXT NOT NULL,  -- JSON [[tick, src_id, dest_id, num_ships], ...]
+        bot TEXT NOT NULL,  -- the bot version that played the line
+        games INTEGER NOT NULL,
+        points REAL NOT NULL,  -- 1 per win, 0.5 per draw
+        PRIMARY KEY (map_hash, seat, bot, line_hash)
+    );
+'''
+
+
+class OpeningRecorder(object):
+
+    ''' Collects the planet orders launched by each seat in the first `ticks`
+        ticks of a game, from the `Changes` of each game update.
+    '''
+
+    def __init__(self, ticks=OPENING_TICKS):
+        self.ticks = ticks
+        self.lines = defaultdict(list)  # {seat: [(tick, src_id, dest_id, num_ships)]}
+
+    def add(self, changes):
+        if changes.tick >= self.ticks:
+            return
+        for f in changes.launched.values():
+            if isinstance(f.src, Planet):
+                self.lines[f.owner_id].append((changes.tick, f.src.id, f.dest.id, f.num_ships))
+
+
+class Opening(object):
+
+    ''' A book line being played. The orders for a tick are only given while
+        the line still applies, that is, every order of the line so far has
+        been valid for the planets the player has.
+    '''
+
+    def __init__(self, line):
+        self.moves = defaultdict(list)  # {tick: [(src_id, dest_id, num_ships)]}
+        for tick, src_id, dest_id, num_ships in line:
+            self.moves[tick].append((src_id, dest_id, num_ships))
+        self.ticks = max(self.moves) + 1 if self.moves else 0
+        self.applies = True
+
+    def orders(self, gameinfo):
+        ''' The orders to play this tick, or None if the line doesn't apply. '''
+        if not self.applies or gameinfo.tick >= self.ticks:
+            return None
+        orders = self.moves.get(gameinfo.tick, [])
+        used = defaultdict(int)
+        for src_id, dest_id, num_ships in orders:
+            src = gameinfo.my_planets.get(src_id)
+            used[src_id] += num_ships
+            if src is None or src.num_ships < used[src_id] or dest_id not in gameinfo.planets:
+                self.applies = False
+                return None
+        return orders
+
+
+class OpeningBook(object):
+
+    ''' The persistent book of opening lines, by (map hash, seat, bot). A
+        line is only served once it has been played at least `min_games`
+        times. If `versions` ({bot name: version}) are given, the bots named
+        are only served the lines their version played (so a ladder still
+        rates the bot, not the book).
+    '''
+
+    def __init__(self, db_path=BOOK_PATH, ticks=OPENING_TICKS, min_games=2, versions=None):
+        self.db_path = db_path
+        self.ticks = ticks
+        self.min_games = min_games
+        self.versions = versions or {}
+        self._db = None
+
+    def __getstate__(self):
+        # (so a book can be sent to worker processes, which reconnect)
+        state = dict(self.__dict__)
+        state['_db'] = None
+        return state
+
+    @property
+    def db(self):
+        if self._db is None:
+            if os.path.dirname(self.db_path):
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._db = sqlite3.connect(self.db_path)
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def add(self, map_hash, seat, line, points, bot=''):
+        ''' Record a line played by the seat (and bot version), and the points
+            it scored. '''
+        text = json.dumps([list(order) for order in line])
+        line_hash = hashlib.sha1(text.encode()).hexdigest()[:16]
+        with self.db:
+            self.db.execute('INSERT INTO lines VALUES (?, ?, ?, ?, ?, 1, ?) '
+                            'ON CONFLICT (map_hash, seat, bot, line_hash) DO UPDATE SET '
+                            'games = games + 1, points = points + excluded.points',
+                            (map_hash, seat, line_hash, text, bot, points))
+
+    def best(self, map_hash, seat, count=1, bot=None):
+        ''' The best (by mean points, then games) lines as (line, points, games,
+            bot), of any bot or just of the given `bot` version. '''
+        where, args = ('AND bot = ? ', [bot]) if bot is not None else ('', [])
+        rows = self.db.execute('SELECT line, points, games, bot FROM lines '
+                               'WHERE map_hash = ? AND seat = ? AND games >= ? ' + where +
+                               'ORDER BY points / games DESC, games DESC LIMIT ?',
+                               [map_hash, seat, self.min_games] + args + [count]).fetchall()
+        return [(json.loads(line), points, games, bot) for line, points, games, bot in rows]
+
+    def line(self, map_hash, seat, name=None):
+        ''' An `Opening` of the best line for the map and seat (for the named
+            bot, see `versions`), or None. '''
+        best = self.best(map_hash, seat, bot=self.versions.get(name))
+        return Opening(best[0][0]) if best else None
+
+
+if __name__ == '__main__':
+    import argparse
+    from headless import load_map
+    from ladder import map_names
+    parser = argparse.ArgumentParser(description='List the best opening book lines.')
+    parser.add_argument('--db', default=BOOK_PATH)
+    parser.add_argument('--maps', nargs='*', help='map names (default: all maps)')
+    parser.add_argument('--count', type=int, default=1, help='lines per map and seat')
+    args = parser.parse_args()
+
+    book = OpeningBook(args.db, min_games=1)
+    for name in args.maps or map_names():
+        key = map_hash(load_map(name))
+        for seat in (1, 2):
+            for line, points, games, bot in book.best(key, seat, args.count):
+                print('%s seat %d: %4.2f (%d games, %s) %s' % (
+                    name, seat, points / games, games, bot, json.dumps(line)))
@@ -0,0 +1,298 @@
+''' Asyncio PlanetWars game server.
+
+Hosts many concurrent PlanetWars matches in one process (no windows). Each
+match is a coroutine that plays one tick and then yields, so matches are
+stepped in turn (asyncio runs ready tasks in FIFO order) and no match can
+starve the others. Seats are either local bots (by name, as usual) or
+"remote" seats, which are played by bots connected over TCP or a Unix socket
+(see client.py). Spectators can also connect and watch the live game state.
+
+The protocol is JSON, one message per line. A connection starts with one of:
+
+    {"type": "play", "game": 3}     # take a remote seat (game is optional)
+    {"type": "watch", "game": 3}    # spectate a game
+    {"type": "new", "map": "map5", "players": ["TestBot", "remote"],
+     "max_game_length": 500}        # create a new match
+
+The server then sends (to players and spectators):
+
+    {"type": "start", "game": 3, "player_id": 2}
+    {"type": "view", "tick": 12, "planets": {...}, "fleets": {...}, "gone": [...]}
+    {"type": "end", "tick": 312, "winner": 1}
+
+and players reply to each view with their orders for that tick:
+
+    {"type": "orders", "tick": 12, "orders": [["planet", src_id, dest_id, ships],
+                                             ["fleet", src_id, dest_id, ships]]}
+
+Views are deltas. A planet is only sent when its owner, ships or "in view"
+status changed, as [x, y, owner_id, num_ships, growth_rate, in_view]. A fleet
+is only sent when it is new (or its ships changed), as [owner_id, num_ships,
+src_x, src_y, dest_id, turns_remaining, x, y] - after that it moves one step
+each tick. Fleets no longer in view are listed in "gone". Spectators get the
+same views of the whole (true) game state.
+
+Usage (from this directory):
+
+    python server.py --port 7777 --games 200 --map map5 --players TestBot remote
+
+'''
+import json
+import asyncio
+from itertools import count
+
+from planet_wars import PlanetWars
+from headless import load_map
+from logger import Logger
+
+REMOTE = 'remote'
+
+
+def send(writer, msg):
+    writer.write((json.dumps(msg) + '\n').encode())
+
+
+class ViewDelta(object):
+
+    ''' Remembers what a client has been sent, so that only changes are sent. '''
+
+    def __init__(self):
+        self.planets = {}
+        self.fleets = {}
+
+    def view(self, tick, planets, fleets, in_view=lambda p: True):
+        msg = {'type': 'view', 'tick': tick, 'planets': {}, 'fleets': {}, 'gone': []}
+        for k, p in planets.items():
+            seen = in_view(p)
+            state = (p.owner_id, p.num_ships, seen)
+            if self.planets.get(k) != state:
+                self.planets[k] = state
+                msg['planets'][k] = [p.x, p.y, p.owner_id, p.num_ships, p.growth_rate, seen]
+        current = {}
+        for k, f in fleets.items():
+            k = str(k)
+            current[k] = state = (f.owner_id, f.num_ships, f.dest.id)
+            if self.fleets.get(k) != state:
+                msg['fleets'][k] = [f.owner_id, f.num_ships, f.src.x, f.src.y,
+                                    f.dest.id, f.turns_remaining, f.x, f.y]
+        msg['gone'] = [k for k in self.fleets if k not in current]
+        self.fleets = current
+        return msg
+
+
+class RemoteBot(object):
+
+    ''' Controller for a seat played by a connected bot. The orders received
+        for a tick are issued (via the usual gameinfo facade) on `update`.
+    '''
+
+    def __init__(self):
+        self.orders = []
+
+    def update(self, gameinfo):
+        fleets = {str(k): f for k, f in gameinfo.my_fleets.items()}
+        for kind, src_id, dest_id, num_ships in self.orders:
+            dest = gameinfo.planets.get(dest_id)
+            if kind == 'planet':
+                src, order = gameinfo.my_planets.get(src_id), gameinfo.planet_order
+            else:
+                src, order = fleets.get(src_id), gameinfo.fleet_order
+            if src and dest:
+                order(src, dest, num_ships)
+        self.orders = []
+
+
+class Match(object):
+
+    ''' A single PlanetWars game hosted by the server. '''
+
+    def __init__(self, id, map_name, players, max_game_length=500, timeout=1.0):
+        self.id = id
+        self.game = PlanetWars(load_map(map_name), logger=Logger('./logs/%s.log'), gameid=id)
+        self.max_game_length = max_game_length
+        self.timeout = timeout
+        self.remote = {}  # {player_id: RemoteBot}
+        self.clients = {}  # {player_id: (reader queue, writer, ViewDelta)}
+        self.spectators = []  # [(writer, ViewDelta)]
+        for name in players:
+            if name == REMOTE:
+                controller = RemoteBot()
+                self.game.add_player(REMOTE, controller=controller)
+                self.remote[len(self.game.players)] = controller
+            else:
+                self.game.add_player(name)
+        self.ready = asyncio.Event()
+        if not self.remote:
+            self.ready.set()
+        self.done = False
+
+    def free_seat(self):
+        for player_id in self.remote:
+            if player_id not in self.clients:
+                return player_id
+        return None
+
+    def join(self, player_id, queue, writer):
+        self.clients[player_id] = (queue, writer, ViewDelta())
+        send(writer, {'type': 'start', 'game': self.id, 'player_id': player_id})
+        if self.free_seat() is None:
+            self.ready.set()
+
+    def watch(self, writer):
+        delta = ViewDelta()
+        send(writer, {'type': 'start', 'game': self.id, 'player_id': 0})
+        send(writer, delta.view(self.game.tick, self.game.planets, self.game.fleets))
+        self.spectators.append((writer, delta))
+
+    async def _orders(self, player_id):
+        ''' Send the player their view, and wait (a while) for their orders. '''
+        queue, writer, delta = self.clients[player_id]
+        player = self.game.players[player_id]
+        send(writer, delta.view(self.game.tick, player.planets, player.fleets,
+                                lambda p: p.vision_age == 0))
+        try:
+            while True:
+                msg = await asyncio.wait_for(queue.get(), self.timeout)
+                if msg is None or msg.get('tick') == self.game.tick:
+                    break
+        except asyncio.TimeoutError:
+            return
+        if msg is None:  # disconnected - the seat will no longer send orders
+            del self.clients[player_id]
+        else:
+            self.remote[player_id].orders = msg.get('orders', [])
+
+    def _broadcast(self, msg=None):
+        game = self.game
+        self.spectators = [(w, d) for w, d in self.spectators if not w.is_closing()]
+        for writer, delta in self.spectators:
+            send(writer, msg or delta.view(game.tick, game.planets, game.fleets))
+
+    async def run(self):
+        await self.ready.wait()
+        game = self.game
+        game.reset()
+        while game.is_alive() and game.tick < self.max_game_length:
+            await asyncio.gather(*[self._orders(i) for i in self.clients])
+            game.update()
+            self._broadcast()
+            # let every other match have a turn
+            await asyncio.sleep(0)
+        winner = game.winner.id if game.winner else 0
+        end = {'type': 'end', 'tick': game.tick, 'winner': winner}
+        for queue, writer, delta in self.clients.values():
+            send(writer, end)
+        self._broadcast(end)
+        self.done = True
+        return winner
+
+
+class GameServer(object):
+
+    ''' Hosts matches and accepts player / spectator connections. '''
+
+    def __init__(self, timeout=1.0, log=print):
+        self.matches = {}
+        self.timeout = timeout
+        self.log = log
+        self._ids = count(1)
+
+    def add_match(self, map_name, players, max_game_length=500):
+        match = Match(next(self._ids), map_name, players, max_game_length, self.timeout)
+        self.matches[match.id] = match
+        asyncio.ensure_future(self._run(match))
+        return match
+
+    async def _run(self, match):
+        try:
+            winner = await match.run()
+            self.log('Game %d: winner %s at tick %d' % (match.id, winner, match.game.tick))
+        finally:
+            self.matches.pop(match.id, None)
+
+    def _find(self, game_id, seat=False):
+        if game_id is not None:
+            return self.matches.get(game_id)
+        for match in self.matches.values():
+            if not seat or match.free_seat() is not None:
+                return match
+        return None
+
+    async def handle(self, reader, writer):
+        ''' Handle a new connection, which says hello then plays or watches. '''
+        queue = asyncio.Queue()
+        try:
+            line = await reader.readline()
+            try:
+                hello = json.loads(line) if line else {}  # (closed before saying hello)
+            except ValueError:
+                hello = None
+            if not isinstance(hello, dict):
+                send(writer, {'type': 'error', 'message': 'hello must be a JSON object'})
+                await writer.drain()
+                return
+            kind = hello.get('type')
+            if kind == 'new':
+                try:
+                    match = self.add_match(hello['map'], hello['players'],
+                                           hello.get('max_game_length', 500))
+                    send(writer, {'type': 'created', 'game': match.id})
+                except (KeyError, FileNotFoundError, ImportError, AttributeError,
+                        ValueError, TypeError) as e:
+                    # (a missing or bad field, an unknown map or bot, or too many players)
+                    send(writer, {'type': 'error', 'message': 'cannot create game: %s: %s'
+                                  % (type(e).__name__, e)})
+            elif kind == 'watch':
+                match = self._find(hello.get('game'))
+                if match:
+                    match.watch(writer)
+                else:
+                    send(writer, {'type': 'error', 'message': 'no such game'})
+            elif kind == 'play':
+                match = self._find(hello.get('game'), seat=True)
+                seat = match and match.free_seat()
+                if seat:
+                    match.join(seat, queue, writer)
+                else:
+                    send(writer, {'type': 'error', 'message': 'no free seat'})
+            await writer.drain()
+            # pass on anything else sent (orders) to the match
+            async for line in reader:
+                await queue.put(json.loads(line))
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            await queue.put(None)
+            writer.close()
+
+    async def serve(self, host='localhost', port=7777, path=None):
+        if path:
+            server = await asyncio.start_unix_server(self.handle, path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Host PlanetWars matches.')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--unix', help='listen on a Unix socket path instead')
+    parser.add_argument('--games', type=int, default=0, help='matches to start with')
+    parser.add_argument('--map', default='map5')
+    parser.add_argument('--players', nargs='+', default=['TestBot', REMOTE])
+    parser.add_argument('--max-game-length', type=int, default=500)
+    parser.add_argument('--timeout', type=float, default=1.0,
+                        help='seconds to wait for remote orders each tick')
+    args = parser.parse_args()
+
+    async def main():
+        server = GameServer(args.timeout)
+        for i in range(args.games):
+            server.add_match(args.map, args.players, args.max_game_length)
+        await server.serve(args.host, args.port, args.unix)
+
+    asyncio.run(main())
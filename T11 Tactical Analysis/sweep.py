@@ -0,0 +1,320 @@
+''' Parameter sweeps / optimisation for tuning PlanetWars bots.
+
+A bot's tunable parameters are its class attributes (for example `max_distance`
+and `defensive_buffer` of `TacticalBot_v2`). Each parameter set (config) is
+injected into the bot for a batch of headless games against some opponents,
+on a number of maps, in both seats, played on a process pool.
+
+Three search methods are supported:
+
+ - grid: every combination of the parameter values
+ - random: uniform random samples from the parameter ranges
+ - es: a diagonal CMA-ES style evolution strategy, which adapts the mean and
+   the (per-parameter) step size of a normal search distribution
+
+Configs are evaluated in rounds (a "race"). After each round, configs whose
+(Hoeffding) upper bound of win rate is below the best lower bound are clearly
+losing and are not played any further.
+
+Every game result is cached in a SQLite database by (bot source hash, params,
+map, seed, opponent, seat), so re-running a sweep only plays the new games.
+
+Usage (from this directory). Parameters are given as name=low:high ranges
+(ints if both values are ints) or name=a,b,c lists of values:
+
+    python sweep.py TacticalBot_v2 max_distance=5:20 defensive_buffer=0:10
+    python sweep.py TacticalBot_v2 max_distance=5,10,15,20 --method grid
+    python sweep.py TacticalBot_v4 extra_ships=0:10 --method es --generations 8
+
+'''
+import os
+import json
+import random
+import sqlite3
+import hashlib
+from math import log, sqrt
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+
+from headless import play_match
+from ladder import bot_version, map_names
+
+DB_PATH = './logs/sweep.db'
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS results (
+        key TEXT PRIMARY KEY,
+        winner INTEGER NOT NULL,  -- winning seat, 0 for a draw
+        ticks INTEGER NOT NULL
+    );
+'''
+
+
+class Param(object):
+    ''' A tunable parameter. Either a list of `values` or a (low, high) range
+        of int (if both are ints) or float values.
+    '''
+
+    def __init__(self, name, low=None, high=None, values=None):
+        self.name = name
+        self.values = values
+        if values:
+            low, high = min(values), max(values)
+        self.low, self.high = low, high
+        self.is_int = isinstance(low, int) and isinstance(high, int)
+
+    @classmethod
+    def FromString(cls, text):
+        ''' Parse a "name=low:high" or "name=a,b,c" parameter spec. '''
+        def number(s):
+            return float(s) if '.' in s else int(s)
+        name, spec = text.split('=')
+        if ':' in spec:
+            low, high = spec.split(':')
+            return cls(name, number(low), number(high))
+        return cls(name, values=[number(s) for s in spec.split(',')])
+
+    def grid(self, steps=5):
+        ''' List of values to use in a grid search. '''
+        if self.values:
+            return list(self.values)
+        if self.is_int and self.high - self.low < steps:
+            return list(range(self.low, self.high + 1))
+        return sorted(set(self.denormalise(i / (steps - 1.0)) for i in range(steps)))
+
+    def sample(self, rng):
+        if self.values:
+            return rng.choice(self.values)
+        return self.denormalise(rng.random())
+
+    def normalise(self, value):
+        ''' Map a value in [low, high] to [0, 1]. '''
+        if self.high == self.low:
+            return 0.5
+        return (value - self.low) / float(self.high - self.low)
+
+    def denormalise(self, x):
+        ''' Map [0, 1] to a (valid) value in [low, high]. '''
+        x = min(max(x, 0.0), 1.0)
+        if self.values:
+            return min(self.values, key=lambda v: abs(self.normalise(v) - x))
+        value = self.low + x * (self.high - self.low)
+        return int(round(value)) if self.is_int else value
+
+
+class Score(object):
+    ''' Running win rate (draws count half) of a config, with Hoeffding
+        confidence bounds.
+    '''
+    DELTA = 0.05
+
+    def __init__(self):
+        self.points = 0.0
+        self.games = 0
+        self.stopped = False
+
+    def add(self, points):
+        self.points += points
+        self.games += 1
+
+    def mean(self):
+        return self.points / self.games if self.games else 0.5
+
+    def margin(self):
+        if not self.games:
+            return 1.0
+        return sqrt(log(2 / self.DELTA) / (2 * self.games))
+
+    def __str__(self):
+        return '%5.3f +/- %5.3f (%d games%s)' % (
+            self.mean(), self.margin(), self.games, ', stopped' if self.stopped else '')
+
+
+def config_key(config):
+    ''' A config is a dict of {name: value}; this is its canonical (hashable) form. '''
+    return json.dumps(config, sort_keys=True)
+
+
+class Sweep(object):
+
+    ''' Evaluates configs of a bot against opponents, with cached results. '''
+
+    def __init__(self, bot, opponents, maps, seeds=1, max_game_length=500,
+                 db_path=DB_PATH, workers=None, batch=8, log=print):
+        self.bot = bot
+        self.opponents = opponents
+        self.max_game_length = max_game_length
+        self.batch = batch
+        self.log = log
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(SCHEMA)
+        self.pool = ProcessPoolExecutor(workers)
+        self.hashes = {name: bot_version(name)[1] for name in [bot] + opponents}
+        # the same (shuffled) list of games is used for every config
+        self.games = [(m, o, seat, seed) for m in maps for o in opponents
+                      for seat in (1, 2) for seed in range(seeds)]
+        random.Random(0).shuffle(self.games)
+        self.scores = {}  # {config_key: Score}
+
+    def close(self):
+        self.pool.shutdown()
+        self.db.close()
+
+    def _game_key(self, config, game):
+        map_name, opponent, seat, seed = game
+        data = [self.hashes[self.bot], config_key(config), map_name, seed,
+                opponent, self.hashes[opponent], seat, self.max_game_length]
+        return hashlib.sha1(json.dumps(data).encode()).hexdigest()
+
+    def _play(self, jobs):
+        ''' Play (or get cached results for) a list of (config, game) jobs.
+            Returns the points scored by the bot in each.
+        '''
+        keys = [self._game_key(config, game) for config, game in jobs]
+        results = {}
+        for key in keys:
+            row = self.db.execute('SELECT winner FROM results WHERE key = ?', (key,)).fetchone()
+            if row:
+                results[key] = row[0]
+        todo = [(key, job) for key, job in zip(keys, jobs) if key not in results]
+        matches = []
+        for key, (config, (map_name, opponent, seat, seed)) in todo:
+            players, params = [self.bot, opponent], [config, None]
+            if seat == 2:
+                players.reverse()
+                params.reverse()
+            matches.append((map_name, players, self.max_game_length, params, seed))
+        with self.db:
+            for (key, job), result in zip(todo, self.pool.map(play_match, matches)):
+                self.db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?)',
+                                (key, result.winner, result.ticks))
+                results[key] = result.winner
+        points = []
+        for key, (config, game) in zip(keys, jobs):
+            winner = results[key]
+            points.append(0.5 if winner == 0 else float(winner == game[2]))
+        return points
+
+    def race(self, configs):
+        ''' Evaluate the configs in rounds of `batch` games each, stopping
+            configs that are clearly losing. Returns a list of Scores (in the
+            same order as the configs).
+        '''
+        scores = [self.scores.setdefault(config_key(c), Score()) for c in configs]
+        unique = list({id(s): (c, s) for c, s in zip(configs, scores)}.values())
+        for start in range(0, len(self.games), self.batch):
+            games = self.games[start:start + self.batch]
+            # (scores of configs seen before may have already played this round)
+            running = [(c, s) for c, s in unique if not s.stopped and s.games == start]
+            jobs = [(c, g) for c, s in running for g in games]
+            points = self._play(jobs)
+            for i, (c, s) in enumerate(running):
+                for p in points[i * len(games):(i + 1) * len(games)]:
+                    s.add(p)
+            # racing - stop configs that are clearly worse than the best
+            racing = [s for c, s in unique if not s.stopped]
+            if not racing: # (all stopped, in this or an earlier race)
+                break
+            best = max(s.mean() - s.margin() for s in racing)
+            for s in racing:
+                if s.mean() + s.margin() < best:
+                    s.stopped = True
+        return scores
+
+    def report(self, configs, scores):
+        ''' Log each (distinct) config and its score, best first. '''
+        results = {config_key(c): s for c, s in zip(configs, scores)}
+        for key, s in sorted(results.items(), key=lambda ks: -ks[1].mean()):
+            self.log('%s  %s' % (s, key))
+
+
+def grid_search(sweep, params, steps=5):
+    ''' Evaluate every combination of parameter values. '''
+    grids = [p.grid(steps) for p in params]
+    configs = [dict(zip([p.name for p in params], values)) for values in product(*grids)]
+    return configs, sweep.race(configs)
+
+
+def random_search(sweep, params, samples=20, seed=0):
+    ''' Evaluate uniform random samples of the parameter space. '''
+    rng = random.Random(seed)
+    configs = []
+    for i in range(samples):
+        config = {p.name: p.sample(rng) for p in params}
+        if config not in configs:
+            configs.append(config)
+    return configs, sweep.race(configs)
+
+
+def es_search(sweep, params, start, generations=10, popsize=8, sigma=0.3, seed=0):
+    ''' A diagonal CMA-ES style search. Each generation samples `popsize`
+        configs from a normal distribution (in normalised [0, 1] parameter
+        space), then moves the mean towards the (weighted) best half and
+        adapts the step size of each parameter to their spread.
+    '''
+    rng = random.Random(seed)
+    n = len(params)
+    mean = [p.normalise(start[p.name]) for p in params]
+    sigmas = [sigma] * n
+    mu = popsize // 2
+    weights = [log(mu + 0.5) - log(i + 1) for i in range(mu)]
+    weights = [w / sum(weights) for w in weights]
+    c_cov = 0.3  # learning rate of the (rank-mu) step size update
+    configs, scores = [], []
+    for gen in range(generations):
+        xs = [[min(max(m + s * rng.gauss(0, 1), 0.0), 1.0) for m, s in zip(mean, sigmas)]
+              for i in range(popsize)]
+        population = [{p.name: p.denormalise(x) for p, x in zip(params, xx)} for xx in xs]
+        results = sweep.race(population)
+        configs.extend(population)
+        scores.extend(results)
+        ranked = sorted(range(popsize), key=lambda i: -results[i].mean())[:mu]
+        old = mean
+        mean = [sum(w * xs[i][j] for w, i in zip(weights, ranked)) for j in range(n)]
+        for j in range(n):
+            var = sum(w * (xs[i][j] - old[j]) ** 2 for w, i in zip(weights, ranked))
+            sigmas[j] = max(sqrt((1 - c_cov) * sigmas[j] ** 2 + c_cov * var), 0.02)
+        best = max(results, key=lambda s: s.mean())
+        sweep.log('Generation %d: best %s, mean %s' % (
+            gen + 1, best, config_key({p.name: p.denormalise(x) for p, x in zip(params, mean)})))
+    return configs, scores
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Tune PlanetWars bot parameters.')
+    parser.add_argument('bot')
+    parser.add_argument('params', nargs='+', help='name=low:high or name=a,b,c')
+    parser.add_argument('--method', choices=['grid', 'random', 'es'], default='random')
+    parser.add_argument('--opponents', nargs='+', default=['TestBot2', 'TacticalBot_v4'])
+    parser.add_argument('--maps', nargs='*', help='map names (default: first 10 maps)')
+    parser.add_argument('--seeds', type=int, default=1)
+    parser.add_argument('--steps', type=int, default=5, help='grid values per range')
+    parser.add_argument('--samples', type=int, default=20, help='random search samples')
+    parser.add_argument('--generations', type=int, default=10)
+    parser.add_argument('--popsize', type=int, default=8)
+    parser.add_argument('--batch', type=int, default=8, help='games per race round')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-game-length', type=int, default=500)
+    parser.add_argument('--db', default=DB_PATH)
+    args = parser.parse_args()
+
+    params = [Param.FromString(p) for p in args.params]
+    maps = args.maps or map_names()[:10]
+    sweep = Sweep(args.bot, args.opponents, maps, args.seeds, args.max_game_length,
+                  args.db, args.workers, args.batch)
+    try:
+        if args.method == 'grid':
+            configs, scores = grid_search(sweep, params, args.steps)
+        elif args.method == 'random':
+            configs, scores = random_search(sweep, params, args.samples)
+        else:
+            mod = __import__('bots.' + args.bot)
+            cls = getattr(getattr(mod, args.bot), args.bot)
+            start = {p.name: getattr(cls, p.name) for p in params}
+            configs, scores = es_search(sweep, params, start, args.generations, args.popsize)
+        sweep.report(configs, scores)
+    finally:
+        sweep.close()
@@ -0,0 +1,114 @@
+''' Search benchmark for large BoxWorld grids.
+
+Times each of the searches (see search_methods) on square BoxWorld grids of
+increasing size, filled with a (seeded) random mix of box kinds, planning from
+the bottom left box to the top right box. For each search it prints the steps
+taken, the path cost found and the time taken, so changes to the searches (or
+to the graph) can be compared on the same worlds.
+
+    python benchmark.py
+    python benchmark.py --sizes 100 200 400 --searches Dijkstra AStar
+    python benchmark.py --frozen   # search the frozen (CSR) graph instead
+    python benchmark.py --implicit --sizes 1000   # or the implicit grid graph
+    python benchmark.py --edits 50   # and replanning after each of 50 edits
+    python benchmark.py --weights 0.95 0 0 0.05   # open maps (few walls)
+    python benchmark.py --targets 50   # the nearest of 50 targets
+
+'''
+import random
+from time import perf_counter
+
+from box_world import BoxWorld, box_kind
+from searches import search_methods, HPAStar
+
+# chance of each box kind in box_kind order ('.', 'm', '~', 'X')
+KIND_WEIGHTS = (0.70, 0.10, 0.10, 0.10)
+
+
+def random_world(size, seed=0, weights=KIND_WEIGHTS, implicit=False):
+    ''' Create a size x size BoxWorld with random box kinds (but a clear start
+    and target), and build its nav graph. '''
+    world = BoxWorld(size, size, 500, 500, implicit)
+    rng = random.Random(seed)
+    for box in world.boxes:
+        box.set_kind(rng.choices(box_kind, weights)[0])
+    world.boxes[0].set_kind('.')
+    world.boxes[-1].set_kind('.')
+    world.reset_navgraph()
+    return world
+
+
+def random_targets(world, count, seed=0):
+    ''' Return the last box idx, and count - 1 other (random) box idx. '''
+    rng = random.Random(seed)
+    return [len(world.boxes) - 1] + rng.sample(range(1, len(world.boxes) - 1), count - 1)
+
+
+def time_search(world, search, limit=0, targets=None):
+    ''' Plan from the first to the last box (or the nearest of targets).
+    Returns the Path and seconds. HPAStar uses the world's (already built)
+    hierarchy if it has one. '''
+    targets = targets or [len(world.boxes) - 1]
+    start = perf_counter()
+    if search == 'HPAStar' and world.hierarchy:
+        path = world.hierarchy.plan(0, targets, limit)
+    else:
+        path = search_methods[search](world.graph, 0, targets, limit)
+    return path, perf_counter() - start
+
+
+def time_replans(world, search, edits, seed=0):
+    ''' Edit a random box on the current path (patching the nav graph) and
+    plan again after each edit, as the BoxWorld window does. Returns the
+    total steps and seconds. '''
+    rng = random.Random(seed)
+    world.start, world.targets = world.boxes[0], [world.boxes[-1]]
+    world.plan_path(search, 0)
+    steps, seconds = 0, 0.0
+    for i in range(edits):
+        boxes = world.path.path[1:-1] or range(1, len(world.boxes) - 1)
+        world.set_kind(rng.choice(boxes), rng.choice(box_kind))
+        start = perf_counter()
+        world.update_navgraph()
+        world.plan_path(search, 0)
+        seconds += perf_counter() - start
+        steps += world.path.steps
+    return steps, seconds
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Time BoxWorld searches.')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[50, 100, 200])
+    parser.add_argument('--searches', nargs='*', default=list(search_methods))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--frozen', action='store_true', help='search graph.freeze()')
+    parser.add_argument('--implicit', action='store_true', help='use a GridGraph')
+    parser.add_argument('--edits', type=int, default=0, help='edits to replan after')
+    parser.add_argument('--weights', type=float, nargs=4, default=KIND_WEIGHTS,
+                        help='chance of each box kind (. m ~ X)')
+    parser.add_argument('--targets', type=int, default=1, help='targets to plan to')
+    args = parser.parse_args()
+
+    print('%6s %-10s %9s %10s %9s' % ('size', 'search', 'steps', 'cost', 'seconds'))
+    for size in args.sizes:
+        start = perf_counter()
+        world = random_world(size, args.seed, args.weights, args.implicit)
+        print('%6d %-10s %9s %10s %9.3f' % (size, '(graph)', '', '', perf_counter() - start))
+        if args.frozen:
+            start = perf_counter()
+            world.graph = world.graph.freeze()
+            print('%6d %-10s %9s %10s %9.3f' % (size, '(freeze)', '', '', perf_counter() - start))
+        for search in args.searches:
+            if search == 'HPAStar':
+                start = perf_counter()
+                world.hierarchy = HPAStar(world.graph, size, size)
+                print('%6d %-10s %9s %10s %9.3f' % (size, '(clusters)', '', '', perf_counter() - start))
+            targets = random_targets(world, args.targets, args.seed)
+            path, seconds = time_search(world, search, 0, targets)
+            cost = '%.2f' % float(path.path_cost) if path.path else path.path_cost
+            print('%6d %-10s %9d %10s %9.3f' % (size, search, path.steps, cost, seconds))
+        for search in args.searches if args.edits else []:
+            world = random_world(size, args.seed, args.weights, args.implicit)
+            steps, seconds = time_replans(world, search, args.edits, args.seed)
+            print('%6d %-10s %9d %10s %9.3f' % (size, search, steps, '(%d edits)' % args.edits, seconds))
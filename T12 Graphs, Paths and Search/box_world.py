@@ -47,8 +47,8 @@ from graphics import graphics
 import pyglet
 from pyglet.gl import *
 from point2d import Point2D
-from graph import SparseGraph, Node, Edge
-from searches import search_methods
+from graph import SparseGraph, GridGraph, Node, Edge
+from searches import search_methods, LPAStar, HPAStar
 from math import hypot
 
 # ---
@@ -169,7 +169,7 @@ class Box(object):
             graphics.set_pen_color((.3,.3,1,1))
             graphics.circle(self._vc, 5)
         # box position (simple column,row) (or x,y actually)
-        if self.node:
+        if self.idx >= 0:
             if display_settings['LABELS_ON']:
                 if not self.idx_label:
                     info = "%d" % self.idx
@@ -196,10 +196,12 @@ class Box(object):
 
 class BoxWorld(object):
 
-    # A world made up of boxes
+    # A world made up of boxes. The nav graph is a SparseGraph, or with
+    # implicit=True a GridGraph (no stored nodes or edges, see graph.py).
 
-    def __init__(self, nx, ny, cx, cy):
+    def __init__(self, nx, ny, cx, cy, implicit=False):
         self.boxes = [None]*nx*ny
+        self.implicit = implicit
         self.nx, self.ny = nx, ny # number of box (squares)
         for i in range(len(self.boxes)):
             self.boxes[i] = Box()
@@ -210,6 +212,9 @@ class BoxWorld(object):
         # create nav_graph
         self.path = None
         self.graph = None
+        self.dirty = set() # idx of boxes changed since the nav graph was made
+        self.planner = None # LPAStar kept between plans, see plan_path
+        self.hierarchy = None # HPAStar clusters kept between plans
         self.reset_navgraph()
         self.start = None
         self.targets = []
@@ -247,9 +252,8 @@ class BoxWorld(object):
 
         if display_settings['EDGES_ON']:
             graphics.set_pen_color(name='LIGHT_BLUE')
-            for node, edges in self.graph.edgelist.items():
-                # print node, edges
-                for dest in edges:
+            for node in range(len(self.boxes)):
+                for dest in self.graph.get_neighbours(node):
                     graphics.line_by_pos(self.boxes[node]._vc, self.boxes[dest]._vc)
 
         if self.path:
@@ -341,53 +345,121 @@ class BoxWorld(object):
         ''' Create and store a new nav graph for this box world configuration.
         The graph is build by adding NavNode to the graph for each of the
         boxes in box world. Then edges are created (4-sided).
+        An implicit world instead gets a GridGraph of the box kinds (one byte
+        per box), which works out the same edges when the search asks.
         '''
         self.path = None # invalid so remove if present
-        self.graph = SparseGraph()
+        nx, ny = self.nx, self.ny
+        for i, box in enumerate(self.boxes):
+            box.pos = (i % nx, i // nx) #tuple position
+        if self.implicit:
+            kinds = bytearray(box_kind.index(box.kind) for box in self.boxes)
+            self.graph = GridGraph(nx, ny, kinds, edge_cost_matrix)
+        else:
+            self.graph = SparseGraph()
+            # the grid details of the graph (as a GridGraph has), so searches
+            # can use them (see TargetIndex and SearchHPAStar)
+            self.graph.nx, self.graph.ny = nx, ny
+            self.graph.min_cost = min(c for row in edge_cost_matrix for c in row if c is not None)
+            self.graph.diagonal = 1.4142
         # Set a heuristic cost function for the search to use
         self.graph.cost_h = self._manhattan
         #self.graph.cost_h = self._hypot
         #self.graph.cost_h = self._max
+        if self.implicit:
+            self.dirty.clear()
+            return # (the grid graph has no nodes or edges to add)
 
-        nx, ny = self.nx, self.ny
         # add all the nodes required
         for i, box in enumerate(self.boxes):
-            box.pos = (i % nx, i // nx) #tuple position
             box.node = self.graph.add_node(Node(idx=i))
         # build all the edges required for this world
-        for i, box in enumerate(self.boxes):
-            # four sided N-S-E-W connections
-            if box.kind in no_edge:
-                continue
-            # UP (i + nx)
-            if (i+nx) < len(self.boxes):
-                self._add_edge(i, i+nx)
-            # DOWN (i - nx)
-            if (i-nx) >= 0:
-                self._add_edge(i, i-nx)
-            # RIGHT (i + 1)
-            if (i%nx + 1) < nx:
-                self._add_edge(i, i+1)
-            # LEFT (i - 1)
-            if (i%nx - 1) >= 0:
-                self._add_edge(i, i-1)
-            # Diagonal connections
-            # UP LEFT(i + nx - 1)
-            j = i + nx
-            if (j-1) < len(self.boxes) and (j%nx - 1) >= 0:
-                self._add_edge(i, j-1, 1.4142) # sqrt(1+1)
-            # UP RIGHT (i + nx + 1)
-            j = i + nx
-            if (j+1) < len(self.boxes) and (j%nx + 1) < nx:
-                self._add_edge(i, j+1, 1.4142)
-            # DOWN LEFT(i - nx - 1)
-            j = i - nx
-            if (j-1) >= 0 and (j%nx - 1) >= 0:
-                self._add_edge(i, j-1, 1.4142)
-            # DOWN RIGHT (i - nx + 1)
-            j = i - nx
-            if (j+1) >= 0 and (j%nx +1) < nx:
-                 self._add_edge(i, j+1, 1.4142)
+        for i in range(len(self.boxes)):
+            self._add_box_edges(i)
+        self.dirty.clear()
+
+    # ---
+
+    def _add_box_edges(self, i):
+        ''' Add the edges from box i to its neighbours (if any). '''
+        nx = self.nx
+        # four sided N-S-E-W connections
+        if self.boxes[i].kind in no_edge:
+            return
+        # UP (i + nx)
+        if (i+nx) < len(self.boxes):
+            self._add_edge(i, i+nx)
+        # DOWN (i - nx)
+        if (i-nx) >= 0:
+            self._add_edge(i, i-nx)
+        # RIGHT (i + 1)
+        if (i%nx + 1) < nx:
+            self._add_edge(i, i+1)
+        # LEFT (i - 1)
+        if (i%nx - 1) >= 0:
+            self._add_edge(i, i-1)
+        # Diagonal connections
+        # UP LEFT(i + nx - 1)
+        j = i + nx
+        if (j-1) < len(self.boxes) and (j%nx - 1) >= 0:
+            self._add_edge(i, j-1, 1.4142) # sqrt(1+1)
+        # UP RIGHT (i + nx + 1)
+        j = i + nx
+        if (j+1) < len(self.boxes) and (j%nx + 1) < nx:
+            self._add_edge(i, j+1, 1.4142)
+        # DOWN LEFT(i - nx - 1)
+        j = i - nx
+        if (j-1) >= 0 and (j%nx - 1) >= 0:
+            self._add_edge(i, j-1, 1.4142)
+        # DOWN RIGHT (i - nx + 1)
+        j = i - nx
+        if (j+1) >= 0 and (j%nx +1) < nx:
+             self._add_edge(i, j+1, 1.4142)
+
+    # ---
+
+    def _grid_neighbours(self, i):
+        ''' Return the idx of the (up to) eight boxes around box i. '''
+        nx, ny = self.nx, self.ny
+        x, y = i % nx, i // nx
+        return [(y + dy) * nx + x + dx for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+                if (dx or dy) and 0 <= x + dx < nx and 0 <= y + dy < ny]
+
+    # ---
+
+    def set_kind(self, idx, kind):
+        ''' Set the kind of box idx, and mark it as changed (dirty), so the
+        nav graph around it is patched by the next update_navgraph. '''
+        self.boxes[idx].set_kind(kind)
+        self.dirty.add(idx)
+
+    # ---
+
+    def update_navgraph(self):
+        ''' Patch the nav graph for the boxes changed (see set_kind) since the
+        last update or reset, rather than building a new graph. Only the edges
+        from each changed box and from its (up to) eight neighbours can have
+        changed, so just those are removed and added again. Returns the set of
+        the box idx whose edges were redone (empty if nothing changed).
+        '''
+        if not self.dirty:
+            return set()
+        self.path = None # invalid so remove if present
+        region = set(self.dirty)
+        for idx in self.dirty:
+            region.update(self._grid_neighbours(idx))
+            if self.implicit:
+                self.graph.set_kind(idx, box_kind.index(self.boxes[idx].kind))
+        self.dirty.clear()
+        if not self.implicit:
+            for idx in region:
+                self.graph.remove_edges_from(idx)
+                self._add_box_edges(idx)
+        if self.planner:
+            self.planner.update(region)
+        if self.hierarchy:
+            self.hierarchy.update(region)
+        return region
 
     # ---
 
@@ -432,14 +504,29 @@ class BoxWorld(object):
 
         self.agent_position = self.start._vc.copy()
         target_positions = list(map(lambda target : target.idx, self.targets))
-        self.path = search_methods[search](self.graph, self.start.idx, target_positions, limit)
+        if search == 'LPAStar' and limit == 0:
+            # keep the planner, so after edits (see update_navgraph) it only
+            # repairs its last search, unless the graph, start or targets change
+            planner = self.planner
+            if (planner is None or planner.graph is not self.graph or
+                    planner.source_idx != self.start.idx or planner.targets != target_positions):
+                planner = self.planner = LPAStar(self.graph, self.start.idx, target_positions)
+            self.path = planner.plan()
+        elif search == 'HPAStar':
+            # keep the clusters (patched by update_navgraph) for each plan
+            if self.hierarchy is None or self.hierarchy.graph is not self.graph:
+                self.hierarchy = HPAStar(self.graph, self.nx, self.ny)
+            self.path = self.hierarchy.plan(self.start.idx, target_positions, limit)
+        else:
+            self.path = search_methods[search](self.graph, self.start.idx, target_positions, limit)
 
     # ---
 
     @classmethod
-    def FromFile(cls, filename, pixels=(500,500)):
+    def FromFile(cls, filename, pixels=(500,500), implicit=False):
         '''Support a the construction of a BoxWorld map from a simple text file.
         See the module doc details at the top of this file for format details.
+        (See BoxWorld for the implicit option.)
         '''
         # open and read the file
         f = open(filename)
@@ -453,7 +540,7 @@ class BoxWorld(object):
         nx, ny = [int(bit) for bit in lines.pop(0).split()]
         # Create a new BoxWorld to store all the new boxes in...
         cx, cy = pixels
-        world = BoxWorld(nx, ny, cx, cy)
+        world = BoxWorld(nx, ny, cx, cy, implicit)
         # Get and set the Start and Target tiles
         s_idx, t_idx = [int(bit) for bit in lines.pop(0).split()]
         world.set_start(s_idx)
@@ -3,7 +3,13 @@ based searches for path between points.
 
 Created for COS30002 AI for Games by Clinton Woodward cwoodward@swin.edu.au
 
+A SparseGraph can be "frozen" into an immutable FrozenGraph, which keeps the
+same edges in a compact compressed sparse row (CSR) form for fast searches.
+A GridGraph is a grid of cells that works out its edges only when asked.
+
 '''
+from array import array
+from bisect import bisect_left
 
 class Edge(object):
     '''A single weighted (has a cost) and directed (has direction) edge. '''
@@ -29,6 +35,7 @@ class SparseGraph(object):
     def __init__(self, digraph=True):
         self.nodes = {} # dictionary
         self.edgelist = {} # dictionary of dictionaries
+        self.backlist = {} # the same edges, by to_idx then from_idx
         self.digraph = digraph
         self.next_node_idx = 0
         self.cost_h = None # heuristic cost function reference
@@ -65,6 +72,20 @@ class SparseGraph(object):
         keys.sort() # in-place
         return keys
 
+    def get_neighbour_costs(self, node_idx):
+        ''' Return the linked nodes (as get_neighbours does) and a matching
+        list of the cost of the edge to each. '''
+        edges = self.edgelist[node_idx]
+        keys = sorted(edges)
+        return keys, [edges[k].cost for k in keys]
+
+    def get_predecessor_costs(self, node_idx):
+        ''' Return the nodes with edges to this node (sorted) and a matching
+        list of the cost of the edge from each, for backward searches. '''
+        edges = self.backlist[node_idx]
+        keys = sorted(edges)
+        return keys, [edges[k].cost for k in keys]
+
     def add_node(self, node):
         ''' Add new node and assign it the current next_node_idx. '''
         # It is possible to "jump" index values and leave gaps in the sequence.
@@ -72,19 +93,21 @@ class SparseGraph(object):
             node.idx = self.next_node_idx
         self.next_node_idx = node.idx + 1
         # Keep the node, prepare the edgelist for edges
+        for to_idx in self.edgelist.get(node.idx, ()):
+            del self.backlist[to_idx][node.idx]
         self.nodes[node.idx] = node
         self.edgelist[node.idx] = {}
+        self.backlist.setdefault(node.idx, {})
         # It can be useful to return the node just added...
         return node
 
     def remove_node(self, idx):
         ''' remove this node, and any edges to/from other nodes '''
         del self.nodes[idx]
-        if idx in self.edgelist:
-            del self.edgelist[idx]
-        for from_idx, list in self.edgelist.items():
-            if idx in list:
-                del self.edgelist[from_idx][idx]
+        for to_idx in self.edgelist.pop(idx, ()):
+            del self.backlist[to_idx][idx]
+        for from_idx in self.backlist.pop(idx, ()):
+            del self.edgelist[from_idx][idx]
 
     def add_edge(self, edge):
         ''' Adds edge to the graph. Ensures that the nodes are valid.
@@ -92,20 +115,30 @@ class SparseGraph(object):
 
         assert (edge.from_idx in self.nodes and edge.to_idx in self.nodes), 'invalid node idx'
         self.edgelist[edge.from_idx][edge.to_idx] = edge
+        self.backlist[edge.to_idx][edge.from_idx] = edge
 
         if not self.digraph:
             opp = Edge(edge.to_idx, edge.from_idx, edge.cost)
             self.edgelist[opp.from_idx][opp.to_idx] = opp
+            self.backlist[opp.to_idx][opp.from_idx] = opp
 
     def remove_edge(self, from_idx, to_idx):
         ''' Remove edge. If not a digraph remove back edge also'''
         if from_idx in self.edgelist:
             if to_idx in self.edgelist[from_idx]:
                 del self.edgelist[from_idx][to_idx]
+                del self.backlist[to_idx][from_idx]
         if not self.digraph:
             if to_idx in self.edgelist:
                 if from_idx in self.edgelist[to_idx]:
                     del self.edgelist[to_idx][from_idx]
+                    del self.backlist[from_idx][to_idx]
+
+    def remove_edges_from(self, from_idx):
+        ''' Remove all the edges from this node. If not a digraph the back
+        edges are removed also. '''
+        for to_idx in list(self.edgelist[from_idx]):
+            self.remove_edge(from_idx, to_idx)
 
     def num_nodes(self):
         ''' return the number of nodes (active+inactive) '''
@@ -120,6 +153,7 @@ class SparseGraph(object):
         self.next_node_idx = 0
         self.nodes = {}
         self.edgelist = {}
+        self.backlist = {}
 
     def path_cost(self, path):
         '''Return the cost of travelling on each node in the path list.'''
@@ -132,6 +166,10 @@ class SparseGraph(object):
     def summary(self):
         return 'n:%d e:%d (digraph:%d)' % (self.num_nodes(), self.num_edges(), self.digraph)
 
+    def freeze(self):
+        ''' Return an immutable FrozenGraph (CSR) copy of the graph. '''
+        return FrozenGraph(self)
+
     def get_adj_list_str(self):
         ''' simple method to pretty-format (sorted) edges as an adjacency list '''
         result = []
@@ -160,6 +198,254 @@ class SparseGraph(object):
         return g
 
 
+class FrozenGraph(object):
+    '''An immutable copy of a SparseGraph (see SparseGraph.freeze) in
+    compressed sparse row (CSR) form. The edges are kept in two flat typed
+    arrays, `targets` (to_idx) and `costs`, with the edges from node idx
+    (sorted by to_idx) at offsets[idx] up to offsets[idx+1]. Neighbours are
+    returned as memoryview slices of the arrays, so searches don't create any
+    lists or Edge objects. It can be searched just like a SparseGraph.
+    '''
+
+    def __init__(self, graph):
+        self.digraph = graph.digraph
+        self.cost_h = graph.cost_h
+        for name in ('nx', 'ny', 'min_cost', 'diagonal'): # (grid details, if given)
+            if hasattr(graph, name):
+                setattr(self, name, getattr(graph, name))
+        self.node_idxs = frozenset(graph.nodes)
+        size = max(self.node_idxs) + 1 if self.node_idxs else 0
+        self.offsets = array('l', [0]) # (node idx may have gaps - no edges)
+        self.targets = array('l')
+        self.costs = array('d')
+        for idx in range(size):
+            edges = graph.edgelist.get(idx, {})
+            keys = sorted(edges)
+            self.targets.extend(keys)
+            self.costs.extend(edges[k].cost for k in keys)
+            self.offsets.append(len(self.targets))
+        self._targets = memoryview(self.targets)
+        self._costs = memoryview(self.costs)
+        self._reverse = None # CSR of the edges by to_idx, see get_predecessor_costs
+
+    def is_empty(self):
+        return len(self.node_idxs) == 0
+
+    def is_node(self, idx):
+        return idx in self.node_idxs
+
+    def _find(self, from_idx, to_idx):
+        # position of the edge in the arrays, or None
+        if from_idx not in self.node_idxs:
+            return None
+        lo, hi = self.offsets[from_idx], self.offsets[from_idx+1]
+        i = bisect_left(self.targets, to_idx, lo, hi)
+        return i if i < hi and self.targets[i] == to_idx else None
+
+    def is_edge(self, from_idx, to_idx):
+        return self._find(from_idx, to_idx) is not None
+
+    def get_edge(self, from_idx, to_idx):
+        ''' Return a (new) Edge that joins the two nodes, or None. '''
+        i = self._find(from_idx, to_idx)
+        return None if i is None else Edge(from_idx, to_idx, self.costs[i])
+
+    def get_neighbours(self, node_idx):
+        ''' Return the linked nodes as a (read-only) sequence of idx values. '''
+        return self._targets[self.offsets[node_idx]:self.offsets[node_idx+1]]
+
+    def get_neighbour_costs(self, node_idx):
+        ''' Return the linked nodes and a matching sequence of edge costs. '''
+        lo, hi = self.offsets[node_idx], self.offsets[node_idx+1]
+        return self._targets[lo:hi], self._costs[lo:hi]
+
+    def get_predecessor_costs(self, node_idx):
+        ''' Return the nodes with edges to this node and a matching sequence
+        of edge costs. (The reverse arrays are made when first needed.) '''
+        if self._reverse is None:
+            self._reverse = self._make_reverse()
+        offsets, sources, costs = self._reverse
+        lo, hi = offsets[node_idx], offsets[node_idx+1]
+        return sources[lo:hi], costs[lo:hi]
+
+    def _make_reverse(self):
+        # counting sort of the edges by to_idx (from_idx stays sorted)
+        size = len(self.offsets) - 1
+        counts = [0] * (size + 1)
+        for to_idx in self.targets:
+            counts[to_idx + 1] += 1
+        for i in range(size):
+            counts[i + 1] += counts[i]
+        offsets = array('l', counts)
+        sources = array('l', [0]) * len(self.targets)
+        costs = array('d', [0.0]) * len(self.costs)
+        for from_idx in range(size):
+            for i in range(self.offsets[from_idx], self.offsets[from_idx+1]):
+                j = counts[self.targets[i]]
+                sources[j] = from_idx
+                costs[j] = self.costs[i]
+                counts[self.targets[i]] += 1
+        return offsets, memoryview(sources), memoryview(costs)
+
+    def num_nodes(self):
+        return len(self.node_idxs)
+
+    def num_edges(self):
+        return len(self.targets)
+
+    def path_cost(self, path):
+        '''Return the cost of travelling on each node in the path list.'''
+        result = 0
+        for i,j in zip(path[:-1], path[1:]):
+            result += self.get_edge(i, j).cost
+        return result
+
+    def summary(self):
+        return 'n:%d e:%d (digraph:%d, frozen)' % (self.num_nodes(), self.num_edges(), self.digraph)
+
+
+class GridGraph(object):
+    '''A graph of a grid of nx by ny cells (cell idx = nx * y + x), where each
+    cell is a node linked to its (up to) eight neighbours. No nodes or edges
+    are stored. Instead, the edges from a cell and their costs are worked out
+    when they are asked for, from the `kinds` of the cells (a bytearray, so
+    one byte per cell) and a `cost_matrix`, where cost_matrix[k1][k2] is the
+    cost from a cell of kind k1 to one of kind k2 (None for no edge).
+    Diagonal edges cost `diagonal` times as much. Cell kinds can be changed
+    at any time (see set_kind). It can be searched just like a SparseGraph.
+    '''
+
+    def __init__(self, nx, ny, kinds, cost_matrix, diagonal=1.4142):
+        assert len(kinds) == nx * ny, 'kinds must have one value per cell'
+        self.nx, self.ny = nx, ny
+        self.kinds = kinds
+        self.digraph = True
+        self.cost_h = None # heuristic cost function reference
+        # flat [k1 * num_kinds + k2] cost tables for straight/diagonal edges
+        self.num_kinds = len(cost_matrix)
+        self._costs = [cost for row in cost_matrix for cost in row]
+        self._diag_costs = [None if cost is None else cost * diagonal for cost in self._costs]
+        self.diagonal = diagonal
+        # the lowest cost of a (straight) step, so a path of n steps costs at least n times it
+        self.min_cost = min([cost for cost in self._costs if cost is not None] or [0.0])
+
+    def set_kind(self, idx, kind):
+        ''' Set the kind (cost_matrix index) of a cell. '''
+        self.kinds[idx] = kind
+
+    def is_empty(self):
+        return len(self.kinds) == 0
+
+    def is_node(self, idx):
+        return 0 <= idx < len(self.kinds)
+
+    def get_neighbour_costs(self, node_idx):
+        ''' Return a list of the linked nodes (sorted) as idx values, and a
+        matching list of the cost of the edge to each. '''
+        kinds, num_kinds = self.kinds, self.num_kinds
+        costs, diag_costs = self._costs, self._diag_costs
+        row = kinds[node_idx] * num_kinds
+        idxs, result = [], []
+        for idx, diagonal in self._steps(node_idx):
+            cost = (diag_costs if diagonal else costs)[row + kinds[idx]]
+            if cost is not None:
+                idxs.append(idx)
+                result.append(cost)
+        return idxs, result
+
+    def get_predecessor_costs(self, node_idx):
+        ''' Return a list of the nodes (sorted) with edges to this node, and
+        a matching list of the cost of the edge from each. '''
+        kinds, num_kinds = self.kinds, self.num_kinds
+        costs, diag_costs = self._costs, self._diag_costs
+        kind = kinds[node_idx]
+        idxs, result = [], []
+        for idx, diagonal in self._steps(node_idx):
+            cost = (diag_costs if diagonal else costs)[kinds[idx] * num_kinds + kind]
+            if cost is not None:
+                idxs.append(idx)
+                result.append(cost)
+        return idxs, result
+
+    def _steps(self, node_idx):
+        nx, kinds = self.nx, self.kinds
+        x = node_idx % nx
+        left, right = x > 0, x < nx - 1
+        # (from/to idx, diagonal?) in idx order: down row, this row, up row
+        steps = []
+        if node_idx >= nx:
+            down = node_idx - nx
+            if left: steps.append((down - 1, True))
+            steps.append((down, False))
+            if right: steps.append((down + 1, True))
+        if left: steps.append((node_idx - 1, False))
+        if right: steps.append((node_idx + 1, False))
+        if node_idx + nx < len(kinds):
+            up = node_idx + nx
+            if left: steps.append((up - 1, True))
+            steps.append((up, False))
+            if right: steps.append((up + 1, True))
+        return steps
+
+    def get_neighbours(self, node_idx):
+        ''' Return a list of the linked nodes (sorted) as idx values. '''
+        return self.get_neighbour_costs(node_idx)[0]
+
+    def step_cost(self, node_idx, dx, dy):
+        ''' Return the cost of the edge from a cell to the cell dx, dy (each
+        -1, 0 or 1) away from it, or None if there is no such edge. '''
+        nx = self.nx
+        x, y = node_idx % nx + dx, node_idx // nx + dy
+        if not (0 <= x < nx and 0 <= y < self.ny):
+            return None
+        costs = self._diag_costs if dx and dy else self._costs
+        return costs[self.kinds[node_idx] * self.num_kinds + self.kinds[y * nx + x]]
+
+    def is_uniform(self, node_idx):
+        ''' Return True if the cells around a cell are all either the same
+        kind as it, or can't be entered from it (no edge, or off the grid),
+        so all of the edges around it cost the same. '''
+        nx, kinds, costs = self.nx, self.kinds, self._costs
+        kind = kinds[node_idx]
+        row = kind * self.num_kinds
+        if costs[row + kind] is None:
+            return False
+        x, y = node_idx % nx, node_idx // nx
+        for j in range(max(y - 1, 0), min(y + 2, self.ny)):
+            for i in range(max(x - 1, 0), min(x + 2, nx)):
+                other = kinds[j * nx + i]
+                if other != kind and costs[row + other] is not None:
+                    return False
+        return True
+
+    def get_edge(self, from_idx, to_idx):
+        ''' Return a (new) Edge that joins the two nodes, or None. '''
+        idxs, costs = self.get_neighbour_costs(from_idx)
+        if to_idx in idxs:
+            return Edge(from_idx, to_idx, costs[idxs.index(to_idx)])
+        return None
+
+    def is_edge(self, from_idx, to_idx):
+        return self.get_edge(from_idx, to_idx) is not None
+
+    def num_nodes(self):
+        return len(self.kinds)
+
+    def num_edges(self):
+        ''' return the total number of edges in the graph (counts them all) '''
+        return sum(len(self.get_neighbours(idx)) for idx in range(len(self.kinds)))
+
+    def path_cost(self, path):
+        '''Return the cost of travelling on each node in the path list.'''
+        result = 0
+        for i,j in zip(path[:-1], path[1:]):
+            result += self.get_edge(i, j).cost
+        return result
+
+    def summary(self):
+        return 'n:%d (grid %dx%d)' % (self.num_nodes(), self.nx, self.ny)
+
+
 #==============================================================================
 # If this file is run directly, it will test the basic Node, Edge and
 # SparseGraph functionality, and print some results to screen. A nice and
@@ -196,4 +482,7 @@ if __name__ == '__main__':
                 (6,4))
     g = SparseGraph.FromAdjacencyList(adj_list, False)
     print(g.summary())
-    print(g.get_adj_list_str())
\ No newline at end of file
+    print(g.get_adj_list_str())
+    # and frozen
+    f = g.freeze()
+    print(f.summary(), list(f.get_neighbours(3)), f.is_edge(3, 2), f.is_edge(2, 4))
\ No newline at end of file
@@ -87,17 +87,17 @@ class BoxWorldWindow(pyglet.window.Window):
                 box = self.world.get_box_by_pos(x,y)
                 if box:
                     if self.mouse_mode == 'start':
-                        self.world.set_start(box.node.idx)
+                        self.world.set_start(box.idx)
                     elif self.mouse_mode == 'target':
-                        if self.world.boxes[box.node.idx].marker == 'T':
-                            self.world.unset_target(box.node.idx)
+                        if self.world.boxes[box.idx].marker == 'T':
+                            self.world.unset_target(box.idx)
                         else:
-                            self.world.set_target(box.node.idx)
-                        # A* (3) for one target, Dijkstra (2) for multiple targets
-                        self.search_mode = 3 if len(self.world.targets) == 1 else 2
+                            self.world.set_target(box.idx)
+                        # A* (3), which finds the nearest of one or more targets
+                        self.search_mode = 3
                     else:
-                        box.set_kind(self.mouse_mode)
-                    self.world.reset_navgraph()
+                        self.world.set_kind(box.idx, self.mouse_mode)
+                    self.world.update_navgraph() # (only patches around the edit)
                     self._update_label('search')
                     self.plan_path()
                     self._update_label('status','graph changed')
@@ -1,4 +1,6 @@
 '''  PriorityQueue and Path classes for DFS, BSF, Dijkstra and A* searches
+(and bidirectional and one-to-many versions), Jump Point Search (for grids), the LPAStar incremental planner (for graphs
+that change) and the HPAStar hierarchical planner (for large grids).
 
 Created for HIT3046 AI for Games by Clinton Woodward cwoodward@swin.edu.au
 
@@ -6,51 +8,78 @@ See readme.txt for details.
 
 '''
 from heapq import heappush, heappop
+from collections import deque, defaultdict
+
+INF = float('inf')
 
 class PriorityQueue(object):
-    ''' Cost sorted (min-to-max) queue. Equal cost items revert to FIFO order.'''
+    ''' Cost sorted (min-to-max) queue. Equal cost items revert to FIFO order.
+
+    The queue is a binary heap (heapq) of [cost, order, item] entries, along
+    with a dict of {item: entry} for the items in it, so "in", peek and remove
+    don't need to scan the heap. Removing an item only marks its entry (it is
+    dropped when it gets to the top of the heap), so changing the cost of an
+    item (remove then push, or just push) is O(log n). '''
+
+    REMOVED = object() # stands in for the item of a removed entry
 
     def __init__(self):
         self.q = []
+        self.entries = {} # dict of {item: entry} still in the queue
         self.i = 0 # default order counter
 
     def push(self, item, cost):
-        '''Add an item and its cost to the queue. '''
-        heappush(self.q, (cost, self.i, item))
+        '''Add an item and its cost to the queue. An item already in the queue
+        is replaced (so it has the new cost). '''
+        if item in self.entries:
+            self.remove(item)
+        entry = [cost, self.i, item]
+        self.entries[item] = entry
+        heappush(self.q, entry)
         self.i += 1
 
     def pop(self):
         '''Remove the item of lowest cost, or FIFO order if cost equal.
         Returns the item (whatever it is) and the cost as a tuple. '''
-        cost, i, item = heappop(self.q)
-        return item, cost
+        while True:
+            cost, i, item = heappop(self.q)
+            if item is not self.REMOVED:
+                del self.entries[item]
+                return item, cost
+
+    def top(self):
+        '''Return the item of lowest cost and its cost (as pop does), but
+        without removing it. '''
+        q = self.q
+        while q[0][2] is self.REMOVED:
+            heappop(q)
+        return q[0][2], q[0][0]
 
     def __len__(self):
-        return len(self.q)
+        return len(self.entries)
 
     def __str__(self):
         '''Print a sorted view of the queue contents. '''
-        return 'pq: ' + str(sorted(self.q))
+        return 'pq: ' + str(sorted(tuple(entry) for entry in self.entries.values()))
 
     def __contains__(self, item):
-        return any(item == values[2] for values in self.q)
+        return item in self.entries
 
     def __iter__(self):
         '''Support iteration. This enables support of the "in" operator. '''
-        return iter(values[2] for values in self.q)
+        return iter(self.entries)
 
     def peek(self, item):
         '''Return a tuple of (item, cost) if it exists, without removing. '''
-        for values in self.q:
-            if values[2] == item:
-                return (item, values[0])
+        entry = self.entries.get(item)
+        if entry:
+            return (item, entry[0])
 
     def remove(self, item):
-        '''Remove the first item that matches.'''
-        for i, values in enumerate(self.q):
-            if values[2] == item:
-                del self.q[i]
-                return
+        '''Remove the item (if it is in the queue).'''
+        entry = self.entries.pop(item, None)
+        if entry:
+            entry[2] = self.REMOVED
 
 
 class Path(object):
@@ -62,26 +91,34 @@ class Path(object):
         self.closed = closed
         self.target_idx = target_idx
         self.steps = steps
+        self.target_costs = None # dict of {target: cost}, see SearchDijkstraAll
         # Convert dictionary back in to a list of nodes for a path
         if target_idx in route:
-            path = []
-            curr_idx = target_idx
-            while curr_idx != route[curr_idx]:
-                path.append(curr_idx)
-                curr_idx = route[curr_idx]
+            path = self.path_to(target_idx)
             self.result = 'Success! '
 
             self.result += 'Still going...' if target_idx in open else 'Done!'
-            path.append(curr_idx)
-            path.reverse()
             self.path = path
             self.path_cost = str(graph.path_cost(path))
-            self.source_idx = curr_idx
+            self.source_idx = path[0]
         else:
             self.result = 'Failed.'
             self.path = []
             self.path_cost = '---'
 
+    def path_to(self, idx):
+        '''Return the list of nodes on the route from the source to idx (any
+        node reached, not just the target), or [] if not reached. '''
+        route = self.route
+        if idx not in route:
+            return []
+        path = [idx]
+        while idx != route[idx]:
+            idx = route[idx]
+            path.append(idx)
+        path.reverse()
+        return path
+
     def report(self, verbose=2):
         tmp = "%s Steps: %d Cost: %s\n" % (self.result, self.steps, self.path_cost)
         if verbose > 0:
@@ -93,28 +130,108 @@ class Path(object):
             tmp += "Route (%d)=%s\n"   % (len(self.route), self.route)
         return tmp
 
+class TargetIndex(object):
+    ''' The targets of a search, as a set (for the goal test), and the
+    heuristic cost from a node to the nearest of them (cost_h), which is
+    the lowest graph.cost_h to any target, so admissible if it is. Each
+    node's cost is only worked out once (per search).
+
+    With many targets on a grid graph (one with nx, ny, min_cost and
+    diagonal, such as a GridGraph, or the SparseGraph of a BoxWorld, which
+    is given them), checking every target for every node gets slow, so the
+    targets are kept in buckets by square blocks of the grid instead, and
+    the cost used is the octile distance (times min_cost) to the nearest
+    target, which is found from just the blocks near the node. That is
+    admissible (and consistent) for any grid, whatever graph.cost_h is.
+    '''
+
+    MIN_TARGETS = 16 # fewer targets than this are all checked with cost_h
+
+    def __init__(self, graph, target_positions):
+        self.targets = set(target_positions)
+        self.first = target_positions[0]
+        self.h = graph.cost_h
+        self.costs = {} # dict of {idx: heuristic cost} worked out so far
+        self.buckets = None
+        if len(self.targets) >= self.MIN_TARGETS and hasattr(graph, 'min_cost'):
+            nx, ny = graph.nx, graph.ny
+            self.nx, self.min_cost = nx, graph.min_cost
+            self.diagonal = min(graph.diagonal, 2.0) - 1.0 # extra per diagonal step
+            # blocks sized for about one target each
+            self.block = block = max(4, int((nx * ny / len(self.targets)) ** 0.5))
+            self.rings = max(nx, ny) // block + 1
+            self.buckets = defaultdict(list) # {(bx, by): [(x, y) of targets]}
+            for t in self.targets:
+                x, y = t % nx, t // nx
+                self.buckets[(x // block, y // block)].append((x, y))
+
+    def __contains__(self, idx):
+        return idx in self.targets
+
+    def cost_h(self, idx):
+        ''' Return the heuristic cost from idx to the nearest target. '''
+        cost = self.costs.get(idx)
+        if cost is None:
+            h = self.h
+            if self.buckets is not None:
+                cost = self._nearest(idx)
+            elif h is None:
+                cost = 0.0
+            elif len(self.targets) == 1:
+                cost = h(idx, self.first)
+            else:
+                cost = min(h(idx, t) for t in self.targets)
+            self.costs[idx] = cost
+        return cost
+
+    def _nearest(self, idx):
+        # the octile distance to the nearest target, checking the targets in
+        # rings of blocks out from the block of idx
+        buckets, block, diagonal = self.buckets, self.block, self.diagonal
+        x, y = idx % self.nx, idx // self.nx
+        bx, by = x // block, y // block
+        best = INF
+        for r in range(self.rings):
+            if r == 0:
+                blocks = [(bx, by)]
+            else:
+                blocks = [(i, j) for i in range(bx - r, bx + r + 1) for j in (by - r, by + r)]
+                blocks += [(i, j) for j in range(by - r + 1, by + r) for i in (bx - r, bx + r)]
+            for key in blocks:
+                for tx, ty in buckets.get(key, ()):
+                    dx, dy = abs(tx - x), abs(ty - y)
+                    best = min(best, max(dx, dy) + diagonal * min(dx, dy))
+            # targets in rings farther out are at least r * block + 1 steps away
+            if best <= r * block + 1:
+                break
+        return best * self.min_cost
+
 def SearchDFS(graph, source_idx, target_positions, limit=0):
     ''' Depth First Search. '''
     closed = set() # set - of visited nodes
     route = {} # dict of {to:from} items to find our way home
     open = [] # use a list as a LIFO stack of the current leaf edges
+    seen = set() # set - of nodes ever added to open (so open + closed)
+    targets = set(target_positions)
     steps = 0 # if limit
     end = None
     # add the starting source as an edge tuple to self
     open.append( source_idx )
+    seen.add(source_idx)
     route[source_idx] = source_idx # to:from
     # search loop
     while len(open):
         steps += 1
         leaf = open.pop() # get the last added (LIFO) edge to investigate
         closed.add(leaf) # set as 'visited'
-        if leaf in target_positions:
+        if leaf in targets:
             end = leaf
             break
         else:
             idxs = graph.get_neighbours(leaf)
             for dest in idxs:
-                if dest not in closed and dest not in open:
+                if dest not in seen:
+                    seen.add(dest)
                     route[dest] = leaf # to:from
                     open.append( dest )
         # stop early?
@@ -127,25 +244,29 @@ def SearchBFS(graph, source_idx, target_positions, limit=0):
     ''' Breadth First Search. '''
     closed = set() # set - of visited nodes
     route = {} # dict of {to:from} items to find our way home
-    open = [] # use a list as a FIFO queue of the current leaf edges
+    open = deque() # use a deque as a FIFO queue of the current leaf edges
+    seen = set() # set - of nodes ever added to open (so open + closed)
+    targets = set(target_positions)
     steps = 0 # if limit
     end = None
 
     # add the starting source as an edge tuple to self
     open.append( source_idx )
+    seen.add(source_idx)
     route[source_idx] = source_idx # to:from
     # search loop
     while len(open):
         steps += 1
-        leaf = open.pop(0) # get's the first (FIFO) node to investigate
+        leaf = open.popleft() # get's the first (FIFO) node to investigate
         closed.add(leaf)
-        if leaf in target_positions:
+        if leaf in targets:
             end = leaf
             break
         else:
             idxs = graph.get_neighbours(leaf)
             for dest in idxs:
-                if dest not in closed and dest not in open: # visited
+                if dest not in seen: # visited or queued
+                    seen.add(dest)
                     route[dest] = leaf # to:from
                     open.append( dest )
         # stop early?
@@ -159,6 +280,7 @@ def SearchDijkstra(graph, source_idx, target_positions, limit=0):
     closed = set() # set - of visited nodes
     route = {} # dict of {to:from} items to find our way home
     open = PriorityQueue() # priority queue of the current leaf edges
+    targets = set(target_positions)
     steps = 0 # if limit
     end = None
 
@@ -170,65 +292,717 @@ def SearchDijkstra(graph, source_idx, target_positions, limit=0):
         steps += 1
         leaf, cost = open.pop() # get the lowest cost-so-far node to investigate
         closed.add(leaf)
-        if leaf in target_positions:
+        if leaf in targets:
             end = leaf
             break
         else:
-            idxs = graph.get_neighbours(leaf)
-            for dest in idxs:
+            idxs, costs = graph.get_neighbour_costs(leaf)
+            for dest, edge_cost in zip(idxs, costs):
                 if dest not in closed: # visited
-                    cost_f = cost + graph.get_edge(leaf,dest).cost # cost_g
-                    if dest in open: # old path to same node?
-                        if open.peek(dest)[1] <= cost_f: # if better, keep it
-                            continue
-                        else: # remove the old, and the new one be added
-                            open.remove(dest)
+                    cost_f = cost + edge_cost # cost_g
+                    if dest in open and open.peek(dest)[1] <= cost_f:
+                        continue # old path to same node is better, keep it
                     route[dest] = leaf # to:from
-                    open.push(dest, cost_f )
+                    open.push(dest, cost_f) # (replaces any old path)
         # stop early?
         if limit > 0 and steps >= limit:
             break
     # return the partial/complete path details
     return Path(graph, route, end, open, closed, steps)
 
+def SearchDijkstraAll(graph, source_idx, target_positions, limit=0):
+    ''' One-to-many Dijkstra Search. As SearchDijkstra, but keep going until
+    all the targets are reached, so one search finds the best path to each.
+    The Path is to the nearest target, with the cost to each target reached
+    in target_costs (and the path to each from path_to). '''
+    closed = set() # set - of visited nodes
+    route = {} # dict of {to:from} items to find our way home
+    open = PriorityQueue() # priority queue of the current leaf edges
+    steps = 0 # if limit
+    end = None
+    targets = set(target_positions) # targets not reached yet
+    target_costs = {} # dict of {target: cost} reached
+
+    # add starting node, with cost-so-far (G)
+    open.push( source_idx, 0.0 )
+    route[source_idx] = source_idx # to:from
+    # search loop
+    while len(open):
+        steps += 1
+        leaf, cost = open.pop() # get the lowest cost-so-far node to investigate
+        closed.add(leaf)
+        if leaf in targets:
+            targets.remove(leaf)
+            target_costs[leaf] = cost
+            if end is None:
+                end = leaf # the nearest
+            if not targets:
+                break
+        idxs, costs = graph.get_neighbour_costs(leaf)
+        for dest, edge_cost in zip(idxs, costs):
+            if dest not in closed: # visited
+                cost_f = cost + edge_cost # cost_g
+                if dest in open and open.peek(dest)[1] <= cost_f:
+                    continue # old path to same node is better, keep it
+                route[dest] = leaf # to:from
+                open.push(dest, cost_f) # (replaces any old path)
+        # stop early?
+        if limit > 0 and steps >= limit:
+            break
+    # return the partial/complete path details
+    path = Path(graph, route, end, open, closed, steps)
+    path.target_costs = target_costs
+    return path
+
 def SearchAStar(graph, source_idx, target_positions, limit=0):
-    ''' A* Search. Expand the minimum path cost-so-far + lowest heuristic cost. '''
+    ''' A* Search. Expand the minimum path cost-so-far + lowest heuristic cost
+    (to the nearest target, see TargetIndex). '''
     closed = set() # set - of visited nodes
     route = {} # dict of {to:from} items to find our way home
     open = PriorityQueue() # priority queue of the current leaf edges
     steps = 0
     end = None
-    target_idx = target_positions[0]
+    targets = TargetIndex(graph, target_positions)
     # add starting node, with F = cost-so-far (G) + heuristic (H)
-    open.push(source_idx, graph.cost_h(source_idx, target_idx))
+    open.push(source_idx, targets.cost_h(source_idx))
     route[source_idx] = source_idx
     # search loop
     while len(open):
         steps += 1
         leaf, cost_f = open.pop() # get the lowest cost-so-far node to investigate
         closed.add(leaf) # set 'visited'
-        if leaf in target_positions:
+        if leaf in targets:
             end = leaf
+            break
         else:
             # use the old cost_f to get the real base cost_g for the path so-far
-            cost = cost_f - graph.cost_h(leaf, target_idx)
+            cost = cost_f - targets.cost_h(leaf)
             # get new children
-            idxs = graph.get_neighbours(leaf)
-            for dest in idxs:
+            idxs, costs = graph.get_neighbour_costs(leaf)
+            for dest, edge_cost in zip(idxs, costs):
                 if dest not in closed: # visited
-                    cost_g = cost + graph.get_edge(leaf, dest).cost # G cost-so-far
-                    cost_h = graph.cost_h(dest, target_idx) # H estimated-cost
+                    cost_g = cost + edge_cost # G cost-so-far
+                    cost_h = targets.cost_h(dest) # H estimated-cost
                     cost_f = cost_g + cost_h
-                    if dest in open:
-                        if open.peek(dest)[1] <= cost_f:
-                            continue
-                        else:
-                            open.remove(dest)
+                    if dest in open and open.peek(dest)[1] <= cost_f:
+                        continue
+                    route[dest] = leaf
+                    open.push(dest, cost_f) # (replaces any old path)
+        # stop early?
+        if limit > 0 and steps >= limit:
+            break
+    # return the partial/complete path details
+    return Path(graph, route, end, open, closed, steps)
+
+def _search_bidirectional(graph, source_idx, target_positions, limit, use_h):
+    # a search forward from the source, and one backward (along edges to each
+    # node, see get_predecessor_costs) from all of the targets, expanding the
+    # side with the fewest open nodes each step, until they meet at the best
+    # cost (mu) that the open nodes of the two sides show can't be bettered
+    targets = set(target_positions)
+    cost_h = graph.cost_h if use_h else None
+    if cost_h:
+        h = (TargetIndex(graph, target_positions).cost_h, # to a target
+             lambda idx: cost_h(source_idx, idx)) # from the source
+    else:
+        h = (lambda idx: 0.0, lambda idx: 0.0)
+    edges = (graph.get_neighbour_costs,
+             graph.get_predecessor_costs if graph.digraph else graph.get_neighbour_costs)
+    g = ({source_idx: 0.0}, dict.fromkeys(targets, 0.0)) # cost-so-far, each side
+    route = ({source_idx: source_idx}, {t: t for t in targets}) # to:from, each side
+    open = (PriorityQueue(), PriorityQueue())
+    closed = (set(), set())
+    open[0].push(source_idx, h[0](source_idx))
+    for t in targets:
+        open[1].push(t, h[1](t))
+    mu, meet = (0.0, source_idx) if source_idx in targets else (INF, None)
+    steps = 0
+    done = False # True once the path through meet is known to be the best
+    # search loop
+    while len(open[0]) and len(open[1]):
+        # stop when no path through the open nodes can cost less than mu
+        keys = open[0].top()[1], open[1].top()[1]
+        if (max(keys) if cost_h else sum(keys)) >= mu:
+            done = True
+            break
+        steps += 1
+        side = 0 if len(open[0]) <= len(open[1]) else 1
+        other = g[1 - side]
+        leaf, cost_f = open[side].pop()
+        closed[side].add(leaf)
+        idxs, costs = edges[side](leaf)
+        for dest, edge_cost in zip(idxs, costs):
+            if dest not in closed[side]: # visited
+                cost_g = g[side][leaf] + edge_cost
+                if dest in g[side] and g[side][dest] <= cost_g:
+                    continue # old path to same node is better, keep it
+                g[side][dest] = cost_g
+                route[side][dest] = leaf
+                open[side].push(dest, cost_g + h[side](dest))
+                if dest in other and cost_g + other[dest] < mu:
+                    mu, meet = cost_g + other[dest], dest
+        # stop early?
+        if limit > 0 and steps >= limit:
+            break
+    # join the two halves of the path at the meeting node
+    path = []
+    idx = meet
+    while idx is not None and idx != route[0][idx]:
+        path.append(idx)
+        idx = route[0][idx]
+    path.append(idx)
+    path.reverse()
+    idx = meet
+    while idx is not None and idx != route[1][idx]:
+        idx = route[1][idx]
+        path.append(idx)
+    # (with an inadmissible cost_h the halves can cross, so cut any loops)
+    joined, seen = [], {}
+    for idx in path:
+        if idx in seen:
+            for cut in joined[seen[idx] + 1:]:
+                del seen[cut]
+            del joined[seen[idx] + 1:]
+        else:
+            seen[idx] = len(joined)
+            joined.append(idx)
+    # both search trees in one route, with the path (to:from) through it
+    both = dict(route[1])
+    both.update(route[0])
+    for from_idx, to_idx in zip(joined, joined[1:]):
+        both[to_idx] = from_idx
+    end = joined[-1]
+    # (the end target may still be open on the backward side when done)
+    fronts = [idx for idx in list(open[0]) + list(open[1]) if not (done and idx == end)]
+    return Path(graph, both, end, fronts, closed[0] | closed[1], steps)
+
+def SearchBiDijkstra(graph, source_idx, target_positions, limit=0):
+    ''' Bidirectional Dijkstra Search. Expand the minimum path cost-so-far
+    forward from the source, and backward from the targets, until they
+    meet. (The open and closed nodes are of both searches.) '''
+    return _search_bidirectional(graph, source_idx, target_positions, limit, False)
+
+def SearchBiAStar(graph, source_idx, target_positions, limit=0):
+    ''' Bidirectional A* Search. As SearchBiDijkstra, but each side adds the
+    heuristic cost (to the nearest target, or from the source). '''
+    return _search_bidirectional(graph, source_idx, target_positions, limit, True)
+
+class LPAStar(object):
+    ''' Lifelong Planning A* (Koenig and Likhachev). A search that is kept
+    (with its g and rhs cost tables) between plans, so when some edges of
+    the graph change only the part of the search they affect is repaired.
+
+        planner = LPAStar(graph, source_idx, target_positions)
+        path = planner.plan()
+        ... edges from nodes in `changed` are modified ...
+        planner.update(changed)
+        path = planner.plan() # usually far fewer steps than a new search
+
+    g is the cost-so-far found for each node, and rhs the best cost through
+    its predecessors. Nodes where they differ are "inconsistent" and are
+    kept in the open queue (by key). The edges from each expanded node are
+    kept (and indexed by destination, to find predecessors), so that when
+    they change (see update) the old and new destinations can be repaired.
+    The heuristic is graph.cost_h to the nearest target (0 if no cost_h).
+    '''
+
+    def __init__(self, graph, source_idx, target_positions):
+        self.graph = graph
+        self.source_idx = source_idx
+        self.targets = list(target_positions)
+        self.goals = TargetIndex(graph, target_positions)
+        self.g = {} # dict of {idx: cost-so-far} (missing is infinite)
+        self.rhs = {source_idx: 0.0} # dict of {idx: best cost via preds}
+        self.parent = {source_idx: source_idx} # pred the rhs is via
+        self.succ = {} # dict of {from: {to: cost}} of expanded nodes
+        self.pred = defaultdict(dict) # dict of {to: {from: cost}} of the same
+        self.open = PriorityQueue()
+        self.open.push(source_idx, self._key(source_idx))
+
+    def _key(self, idx):
+        cost = min(self.g.get(idx, INF), self.rhs.get(idx, INF))
+        return (cost + self.goals.cost_h(idx), cost)
+
+    def _edges(self, idx):
+        # (cached) edges from idx, also indexed by destination
+        edges = self.succ.get(idx)
+        if edges is None:
+            idxs, costs = self.graph.get_neighbour_costs(idx)
+            edges = self.succ[idx] = dict(zip(idxs, costs))
+            for dest, cost in edges.items():
+                self.pred[dest][idx] = cost
+        return edges
+
+    def _update_node(self, idx):
+        # recompute rhs from the predecessors, and re-queue if inconsistent
+        if idx != self.source_idx:
+            best, parent = INF, None
+            for src, cost in self.pred[idx].items():
+                cost += self.g.get(src, INF)
+                if cost < best:
+                    best, parent = cost, src
+            if best < INF:
+                self.rhs[idx] = best
+                self.parent[idx] = parent
+            else:
+                self.rhs.pop(idx, None)
+                self.parent.pop(idx, None)
+        self.open.remove(idx)
+        if self.g.get(idx, INF) != self.rhs.get(idx, INF):
+            self.open.push(idx, self._key(idx))
+
+    def update(self, changed):
+        ''' Repair the search after the edges from the `changed` nodes have
+        been changed (added, removed or new costs). '''
+        for idx in changed:
+            old = self.succ.pop(idx, None)
+            if old is None:
+                continue # never expanded, so nothing depends on its edges yet
+            for dest in old:
+                del self.pred[dest][idx]
+            new = self._edges(idx)
+            for dest in set(old) | set(new):
+                self._update_node(dest)
+
+    def _best_target(self):
+        return min(self.targets, key=self._key)
+
+    def _stale(self, idx):
+        # the first inconsistent node on the parent chain back from idx, or
+        # None if the chain (so the path to idx) is known
+        g, rhs = self.g, self.rhs
+        while idx in g and g[idx] == rhs.get(idx, INF):
+            if idx == self.source_idx:
+                return None
+            idx = self.parent[idx]
+        return idx
+
+    def _expand(self, leaf):
+        g, rhs = self.g, self.rhs
+        if g.get(leaf, INF) > rhs.get(leaf, INF): # better path found
+            g[leaf] = rhs[leaf]
+            for dest in self._edges(leaf):
+                self._update_node(dest)
+        else: # path got worse, so undo and repair
+            g.pop(leaf, None)
+            for dest in list(self._edges(leaf)) + [leaf]:
+                self._update_node(dest)
+
+    def plan(self, limit=0):
+        ''' Expand inconsistent nodes until the best path to the nearest
+        target is known (or `limit` steps). Returns a Path. '''
+        g, rhs, open = self.g, self.rhs, self.open
+        steps = 0
+        closed = set() # set - of nodes expanded by this plan
+        while len(open):
+            leaf = None
+            target = self._best_target()
+            if open.top()[1] >= self._key(target) and g.get(target, INF) == rhs.get(target, INF):
+                # done, unless (with an inadmissible cost_h) some nodes on
+                # the way to the target are still inconsistent
+                leaf = self._stale(target) if target in g else None
+                if leaf is None:
+                    break
+            # stop early?
+            if limit > 0 and steps >= limit:
+                break
+            steps += 1
+            if leaf is None:
+                leaf, key = open.pop()
+            else:
+                open.remove(leaf)
+            closed.add(leaf)
+            self._expand(leaf)
+        return self._path(closed, steps)
+
+    def _path(self, closed, steps):
+        # route (to:from) of the nodes reached, and the nearest target with a
+        # known path back (following the parent of each node)
+        g = self.g
+        route = {idx: self.parent[idx] for idx in g if idx in self.parent}
+        reached = [t for t in self.targets if t in g and self._stale(t) is None]
+        end = min(reached, key=g.get) if reached else None
+        return Path(self.graph, route, end, list(self.open), closed, steps)
+
+
+def SearchLPAStar(graph, source_idx, target_positions, limit=0):
+    ''' Lifelong Planning A* search, as a one-off (see LPAStar to keep it). '''
+    return LPAStar(graph, source_idx, target_positions).plan(limit)
+
+class HPAStar(object):
+    ''' Hierarchical path-finding A* (Botea, Muller and Schaeffer) over a
+    grid graph of nx by ny nodes (idx = nx * y + x), such as a BoxWorld
+    SparseGraph or GridGraph. The grid is split into square clusters of
+    `size` nodes a side. Where edges cross the border between two clusters
+    "entrance" nodes are picked (the middle of each run of crossings, both
+    ends of long runs, and any lone diagonal crossing, including those
+    across the corner of four clusters), and the costs
+    between the entrances of each cluster are worked out (once) by searches
+    kept inside the cluster.
+
+        hierarchy = HPAStar(graph, nx, ny)
+        path = hierarchy.plan(source_idx, target_positions)
+        ... edges from nodes in `changed` are modified ...
+        hierarchy.update(changed) # only redoes the clusters changed
+
+    To plan, the source and targets are linked to the entrances of their
+    clusters, and the small abstract graph of entrances is searched (A*)
+    first. Only then is each abstract edge of the path found refined into
+    nodes, by a search inside its cluster. The path found is close to (but
+    not always) the best path.
+    '''
+
+    RUN = 6 # crossing runs this long (or more) get an entrance at each end
+
+    def __init__(self, graph, nx, ny, size=10):
+        self.graph = graph
+        self.nx, self.ny, self.size = nx, ny, size
+        self.cx = -(-nx // size) # clusters across (rounded up)
+        self.cy = -(-ny // size)
+        self.borders = {} # dict of {(cluster, cluster): [(idx, idx), ...]}
+        self.links = defaultdict(dict) # {from: {to: cost}} across borders
+        self.entrances = {} # dict of {cluster: set of entrance idx}
+        self.intra = {} # dict of {cluster: {from: {to: cost}}} of entrances
+        for c in range(self.cx * self.cy):
+            for key in self._borders_of(c):
+                if key[0] == c:
+                    self._find_entrances(key)
+        for c in range(self.cx * self.cy):
+            self._link_cluster(c)
+
+    def cluster(self, idx):
+        ''' Return the cluster number of a node idx. '''
+        nx, size = self.nx, self.size
+        return (idx // nx // size) * self.cx + (idx % nx) // size
+
+    def _borders_of(self, c):
+        # the (lower, higher) cluster keys of the (up to) four borders of c,
+        # and of the (up to) four corners it shares with diagonal clusters
+        i, j, cx = c % self.cx, c // self.cx, self.cx
+        left, right, down, up = i > 0, i < cx - 1, j > 0, j < self.cy - 1
+        keys = []
+        if left: keys.append((c - 1, c))
+        if right: keys.append((c, c + 1))
+        if down: keys.append((c - cx, c))
+        if up: keys.append((c, c + cx))
+        if down and left: keys.append((c - cx - 1, c))
+        if down and right: keys.append((c - cx + 1, c))
+        if up and left: keys.append((c, c + cx - 1))
+        if up and right: keys.append((c, c + cx + 1))
+        return keys
+
+    def _cost(self, from_idx, to_idx):
+        idxs, costs = self.graph.get_neighbour_costs(from_idx)
+        for idx, cost in zip(idxs, costs):
+            if idx == to_idx:
+                return cost
+        return None
+
+    def _find_entrances(self, key):
+        # (re)pick the entrance pairs across the border between two clusters
+        nx, size, cx = self.nx, self.size, self.cx
+        c1, c2 = key
+        for a, b in self.borders.get(key, []):
+            self.links[a].pop(b, None)
+            self.links[b].pop(a, None)
+        i, j = c1 % cx, c1 // cx
+        di = c2 % cx - i # (c2 is always in the same row as c1, or above it)
+        if c2 // cx == j: # c2 is to the right, so pairs across a column
+            x = (i + 1) * size - 1
+            cells = [(y * nx + x, y * nx + x + 1)
+                     for y in range(j * size, min((j + 1) * size, self.ny))]
+        elif di == 0: # c2 is above, so pairs across a row
+            y = (j + 1) * size - 1
+            cells = [(y * nx + x, (y + 1) * nx + x)
+                     for x in range(i * size, min((i + 1) * size, nx))]
+        else: # c2 is diagonally above, so the one pair across the corner
+            y = (j + 1) * size - 1
+            x = (i + 1) * size - 1 if di > 0 else i * size
+            cells = [(y * nx + x, (y + 1) * nx + x + di)]
+        # runs of pairs with an edge (either way) across the border
+        runs, run = [], []
+        crossed = []
+        for a, b in cells:
+            costs = (self._cost(a, b), self._cost(b, a))
+            crossed.append(costs != (None, None))
+            if crossed[-1]:
+                run.append((a, b, costs))
+            elif run:
+                runs.append(run)
+                run = []
+        if run:
+            runs.append(run)
+        # and diagonal edges across where there is no straight one near
+        for k in range(len(cells) - 1):
+            if not (crossed[k] or crossed[k + 1]):
+                for a, b in ((cells[k][0], cells[k + 1][1]), (cells[k + 1][0], cells[k][1])):
+                    costs = (self._cost(a, b), self._cost(b, a))
+                    if costs != (None, None):
+                        runs.append([(a, b, costs)])
+        pairs = []
+        for run in runs:
+            chosen = [run[0], run[-1]] if len(run) >= self.RUN else [run[len(run) // 2]]
+            for a, b, (ab, ba) in chosen:
+                pairs.append((a, b))
+                if ab is not None:
+                    self.links[a][b] = ab
+                if ba is not None:
+                    self.links[b][a] = ba
+        self.borders[key] = pairs
+
+    def _search(self, source_idx, cluster, goals):
+        # Dijkstra from source_idx over the nodes of one cluster, until all
+        # goals are reached. Returns the {idx: cost} and {to: from} route of
+        # the nodes expanded.
+        graph, cluster_of = self.graph, self.cluster
+        costs, route = {}, {source_idx: source_idx}
+        open = PriorityQueue()
+        open.push(source_idx, 0.0)
+        goals = set(goals)
+        while len(open) and goals:
+            leaf, cost = open.pop()
+            costs[leaf] = cost
+            goals.discard(leaf)
+            idxs, edge_costs = graph.get_neighbour_costs(leaf)
+            for dest, edge_cost in zip(idxs, edge_costs):
+                if dest not in costs and cluster_of(dest) == cluster:
+                    cost_f = cost + edge_cost
+                    if dest in open and open.peek(dest)[1] <= cost_f:
+                        continue
                     route[dest] = leaf
                     open.push(dest, cost_f)
+        return costs, route
+
+    def _entrances_of(self, c):
+        cluster_of = self.cluster
+        return {idx for key in self._borders_of(c) for pair in self.borders[key]
+                for idx in pair if cluster_of(idx) == c}
+
+    def _link_cluster(self, c):
+        # the costs between each pair of entrances of cluster c
+        entrances = self.entrances[c] = self._entrances_of(c)
+        intra = self.intra[c] = {}
+        for idx in entrances:
+            costs = self._search(idx, c, entrances)[0]
+            intra[idx] = {to: cost for to, cost in costs.items() if to in entrances and to != idx}
+
+    def update(self, changed):
+        ''' Update the clusters after the edges from the `changed` nodes
+        have been changed. Their borders are redone, and then the entrance
+        costs of each cluster changed (or next to one, if its entrances
+        moved). Returns the set of clusters redone. '''
+        clusters = {self.cluster(idx) for idx in changed}
+        keys = {key for c in clusters for key in self._borders_of(c)}
+        for key in keys:
+            self._find_entrances(key)
+        redone = set()
+        for c in {c for key in keys for c in key}:
+            if c in clusters or self._entrances_of(c) != self.entrances[c]:
+                self._link_cluster(c)
+                redone.add(c)
+        return redone
+
+    def _refine(self, from_idx, to_idx, route):
+        # add the nodes of one abstract edge to the route, and return the
+        # nodes expanded to find them
+        c = self.cluster(from_idx)
+        if c != self.cluster(to_idx): # a single edge across a border
+            route[to_idx] = from_idx
+            return ()
+        costs, sub = self._search(from_idx, c, (to_idx,))
+        idx = to_idx
+        while idx != from_idx:
+            route[idx] = sub[idx]
+            idx = sub[idx]
+        return costs
+
+    def plan(self, source_idx, target_positions, limit=0):
+        ''' Search from the source to the nearest target (the abstract
+        graph search stops after `limit` steps, if not 0). Returns a Path.
+        Steps counts the abstract search and the searches inside clusters,
+        and the closed nodes are all the nodes expanded. '''
+        graph, cluster_of = self.graph, self.cluster
+        targets = set(target_positions)
+        closed = set() # set - of nodes expanded (by any of the searches)
+        steps = 0
+        # temporary abstract edges from the source, and in to the targets
+        temp = defaultdict(dict)
+        c = cluster_of(source_idx)
+        goals = self.entrances[c] | {t for t in targets if cluster_of(t) == c}
+        costs = self._search(source_idx, c, goals)[0]
+        temp[source_idx] = {to: cost for to, cost in costs.items() if to in goals}
+        closed.update(costs)
+        steps += len(costs)
+        for t in targets:
+            c = cluster_of(t)
+            for idx in self.entrances[c]:
+                costs = self._search(idx, c, (t,))[0]
+                if t in costs:
+                    temp[idx][t] = costs[t]
+                closed.update(costs)
+                steps += len(costs)
+        # A* over the abstract graph (of entrances)
+        h = TargetIndex(graph, target_positions).cost_h
+        g = {source_idx: 0.0}
+        route = {source_idx: source_idx} # abstract route, then the path
+        open = PriorityQueue()
+        open.push(source_idx, h(source_idx))
+        done = set()
+        end = None
+        while len(open):
+            steps += 1
+            leaf, cost_f = open.pop()
+            done.add(leaf)
+            if leaf in targets:
+                end = leaf
+                break
+            edges = [self.intra[cluster_of(leaf)].get(leaf, {}),
+                     self.links.get(leaf, {}), temp.get(leaf, {})]
+            for dest, edge_cost in [item for e in edges for item in e.items()]:
+                if dest not in done:
+                    cost_g = g[leaf] + edge_cost
+                    if dest in g and g[dest] <= cost_g:
+                        continue
+                    g[dest] = cost_g
+                    route[dest] = leaf
+                    open.push(dest, cost_g + h(dest))
+            # stop early?
+            if limit > 0 and steps >= limit:
+                break
+        closed.update(done)
+        # refine the abstract path found, one abstract edge at a time
+        abstract = []
+        idx = end
+        while idx is not None and idx != route[idx]:
+            abstract.append((route[idx], idx))
+            idx = route[idx]
+        for from_idx, to_idx in abstract:
+            costs = self._refine(from_idx, to_idx, route)
+            closed.update(costs)
+            steps += len(costs)
+        route[source_idx] = source_idx # (in case a refined edge crossed it)
+        return Path(graph, route, end, open, closed, steps)
+
+
+def SearchHPAStar(graph, source_idx, target_positions, limit=0):
+    ''' HPA* search, as a one-off (see HPAStar to keep it). Needs a grid
+    graph (with nx and ny, see GridGraph), others are searched with A*. '''
+    if not hasattr(graph, 'nx'):
+        return SearchAStar(graph, source_idx, target_positions, limit)
+    return HPAStar(graph, graph.nx, graph.ny).plan(source_idx, target_positions, limit)
+
+# the (dx, dy) of the eight directions from a grid cell
+GRID_DIRS = [(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dx or dy]
+
+def _sign(n):
+    return (n > 0) - (n < 0)
+
+def _jps_forced(graph, idx, dx, dy):
+    # directions from idx (reached moving dx, dy) to the "forced" neighbours,
+    # which are only reached at best cost through idx as a wall (or the grid
+    # edge) is in the way of the other paths to them
+    step = graph.step_cost
+    forced = []
+    if dx and dy:
+        if step(idx, -dx, 0) is None and step(idx, -dx, dy) is not None:
+            forced.append((-dx, dy))
+        if step(idx, 0, -dy) is None and step(idx, dx, -dy) is not None:
+            forced.append((dx, -dy))
+    elif dx:
+        for n in (-1, 1):
+            if step(idx, 0, n) is None and step(idx, dx, n) is not None:
+                forced.append((dx, n))
+    else:
+        for n in (-1, 1):
+            if step(idx, n, 0) is None and step(idx, n, dy) is not None:
+                forced.append((n, dy))
+    return forced
+
+def _jps_jump(graph, idx, dx, dy, cost, targets):
+    # step from idx (with cost-so-far) in direction dx, dy, to the next jump
+    # point: a target, a cell that isn't uniform (kinds change around it), a
+    # cell with forced neighbours, or (going diagonally) a cell a straight
+    # jump from finds one. Returns (idx, cost-so-far), or None if none.
+    step, is_uniform, nx = graph.step_cost, graph.is_uniform, graph.nx
+    while True:
+        edge_cost = step(idx, dx, dy)
+        if edge_cost is None:
+            return None
+        idx += dy * nx + dx
+        cost += edge_cost
+        if idx in targets or not is_uniform(idx) or _jps_forced(graph, idx, dx, dy):
+            return idx, cost
+        if dx and dy and (_jps_jump(graph, idx, dx, 0, cost, targets) or
+                          _jps_jump(graph, idx, 0, dy, cost, targets)):
+            return idx, cost
+
+def SearchJPS(graph, source_idx, target_positions, limit=0):
+    ''' Jump Point Search (Harabor and Grastien). A* for a GridGraph, but
+    through uniform cells (where the cells around are all the same kind, so
+    all moves cost the same) it jumps along straight and diagonal lines, and
+    only the jump points where the best path may turn are queued. Walls and
+    the grid edge are allowed for (forced neighbours), and from cells where
+    the kind changes (mud, water etc) all neighbours are searched, as in A*,
+    so the path costs are the same as A* (with an admissible cost_h).
+
+    The route links jump points, and is only filled in cell by cell for the
+    path found. Graphs that are not grids are searched with SearchAStar.
+    '''
+    if not hasattr(graph, 'is_uniform'):
+        return SearchAStar(graph, source_idx, target_positions, limit)
+    closed = set() # set - of visited (jump point) nodes
+    route = {} # dict of {to:from} items to find our way home
+    open = PriorityQueue() # priority queue of the current jump points
+    steps = 0
+    end = None
+    targets = TargetIndex(graph, target_positions)
+    nx = graph.nx
+    # add starting node, with F = cost-so-far (G) + heuristic (H)
+    open.push(source_idx, targets.cost_h(source_idx))
+    route[source_idx] = source_idx
+    # search loop
+    while len(open):
+        steps += 1
+        leaf, cost_f = open.pop()
+        closed.add(leaf) # set 'visited'
+        if leaf in targets:
+            end = leaf
+            break
+        cost = cost_f - targets.cost_h(leaf)
+        # search all directions, unless leaf is uniform (then only onwards
+        # from its parent, and to any forced neighbours)
+        parent = route[leaf]
+        if parent == leaf or not graph.is_uniform(leaf):
+            dirs = GRID_DIRS
+        else:
+            dx, dy = _sign(leaf % nx - parent % nx), _sign(leaf // nx - parent // nx)
+            dirs = [(dx, dy)] + _jps_forced(graph, leaf, dx, dy)
+            if dx and dy:
+                dirs += [(dx, 0), (0, dy)]
+        for dx, dy in dirs:
+            jump = _jps_jump(graph, leaf, dx, dy, cost, targets.targets)
+            if jump is None:
+                continue
+            dest, cost_g = jump
+            if dest not in closed: # visited
+                cost_f = cost_g + targets.cost_h(dest)
+                if dest in open and open.peek(dest)[1] <= cost_f:
+                    continue
+                route[dest] = leaf
+                open.push(dest, cost_f) # (replaces any old path)
         # stop early?
         if limit > 0 and steps >= limit:
             break
+    # fill in the cells between the jump points of the path found
+    idx = end
+    while idx is not None and idx != route[idx]:
+        prev = route[idx]
+        dx, dy = _sign(idx % nx - prev % nx), _sign(idx // nx - prev // nx)
+        cell = prev
+        while cell != idx:
+            route[cell + dy * nx + dx] = cell
+            cell += dy * nx + dx
+        idx = prev
     # return the partial/complete path details
     return Path(graph, route, end, open, closed, steps)
 
@@ -238,4 +1012,10 @@ search_methods = {
     'BFS':      SearchBFS,
     'Dijkstra': SearchDijkstra,
     'AStar':    SearchAStar,
+    'LPAStar':  SearchLPAStar,
+    'JPS':      SearchJPS,
+    'HPAStar':  SearchHPAStar,
+    'BiDijkstra': SearchBiDijkstra,
+    'BiAStar':  SearchBiAStar,
+    'DijkstraAll': SearchDijkstraAll,
 }
\ No newline at end of file
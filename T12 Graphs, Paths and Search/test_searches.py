@@ -0,0 +1,43 @@
+''' Regression tests for the searches (run with pytest). '''
+from graph import GridGraph
+from searches import SearchDijkstra, SearchHPAStar, HPAStar
+
+# cell kinds: 0 is clear, 1 is a wall
+COSTS = [[1.0, None], [None, None]]
+
+
+def corner_grid():
+    ''' A 20 x 20 grid of walls, clear at y=9 for x=0..9 and at y=10 for
+    x=10..19, so the two halves are only joined by the diagonal edge from
+    (9, 9) to (10, 10), across the corner of four 10 x 10 clusters. '''
+    n = 20
+    kinds = bytearray([1] * n * n)
+    for x in range(10):
+        kinds[9 * n + x] = 0
+    for x in range(10, 20):
+        kinds[10 * n + x] = 0
+    return GridGraph(n, n, kinds, COSTS)
+
+
+def test_hpastar_crosses_cluster_corner():
+    graph = corner_grid()
+    source, target = 9 * 20, 10 * 20 + 19
+    best = SearchDijkstra(graph, source, [target])
+    path = SearchHPAStar(graph, source, [target])
+    assert path.result == 'Success! Done!'
+    assert abs(graph.path_cost(path.path) - float(best.path_cost)) < 1e-9
+
+
+def test_hpastar_update_redoes_corner():
+    graph = corner_grid()
+    hierarchy = HPAStar(graph, 20, 20)
+    source, target = 9 * 20, 10 * 20 + 19
+    corner = 10 * 20 + 10
+    # the edges from the corner cell and its neighbours change
+    changed = [corner + dy * 20 + dx for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+    graph.set_kind(corner, 1)
+    hierarchy.update(changed)
+    assert hierarchy.plan(source, [target]).result == 'Failed.'
+    graph.set_kind(corner, 0)
+    hierarchy.update(changed)
+    assert hierarchy.plan(source, [target]).result == 'Success! Done!'
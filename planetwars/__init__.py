@@ -0,0 +1,28 @@
+''' PlanetWars core package.
+
+The game engine shared by the PlanetWars front-ends ("T04 PlanetWars" and
+"T11 Tactical Analysis"). Their `entities`, `planet_wars`, `players` and
+`logger` (and `beliefs`) modules are the modules of this package, so engine
+changes only need to be made (and can only be made) here. The front-ends keep
+their own bots, maps, logs and tools (GUI, ladder etc).
+
+The bot API is stable: a bot is a class in the front-end's bots directory
+(bots/BotName.py contains class BotName) with an `update(gameinfo)` method,
+called each tick with the player's `GameInfo`, which has:
+
+ - planets, my_planets, enemy_planets, neutral_planets, not_my_planets and
+   fleets, my_fleets, enemy_fleets: dicts of {id: Planet / Fleet}
+ - tick, num_ships, distances and the derived (tick cached) details
+ - planet_order(src, dest, num_ships), fleet_order(src, dest, num_ships)
+   and log(message)
+
+Compiled maps and distance tables are shared by all games in a process, and
+the backend used for them can be chosen, see maps.py.
+
+'''
+from .entities import Clock, Entity, Fleet, Planet, NEUTRAL_ID
+from .logger import Logger
+from .beliefs import Beliefs, Estimate
+from .maps import BACKENDS, GameMap, compile_map, distance_table, map_hash, set_backend
+from .players import BotReloader, GameInfo, Player, tick_cached
+from .planet_wars import Changes, PlanetWars
@@ -0,0 +1,107 @@
+''' Fog-of-war belief tracking for PlanetWars players.
+
+A player's copies of planets out of view keep the details from when they were
+last seen (see `vision_age`), so their `num_ships` is out of date. A `Beliefs`
+instance (one per player, updated each tick) keeps track of what has gone out
+of view, so that bots can get an estimate of the current state of every
+planet without each working out their own:
+
+ - planets out of view are projected forward from the tick they were last
+   seen, growing by their growth rate (if owned). Players also launch ships
+   from their planets, so the growth is scaled by the fraction of growth each
+   owner has been seen to keep, measured (as a moving average) each time one
+   of their planets comes back into view
+ - fleets that go out of view before they arrive are kept as "ghost" fleets,
+   and (as a fleet's destination is known) their arrival at a planet out of
+   view is played out using the game battle rules
+
+Estimates are only worked out when asked for (once per tick), see the
+`estimates` and `ghost_fleets` of `GameInfo`. Beliefs are only kept from the
+tick a bot first asks for them, so bots that never do cost nothing.
+
+'''
+from collections import defaultdict, namedtuple
+
+from .entities import NEUTRAL_ID
+
+Estimate = namedtuple('Estimate', 'owner_id num_ships')
+
+
+class Beliefs(object):
+
+    ''' What a player believes about the parts of the game out of view. '''
+    KEPT = 0.25  # fraction of growth kept by an owner (until measured)
+    RATE = 0.2  # moving average rate of the kept fraction
+
+    def __init__(self):
+        self.tracking = False  # updated each tick? (set when first used)
+        self.ghosts = {}  # {fleet_id: fleet} out of view, not yet arrived
+        self.kept = defaultdict(lambda: self.KEPT)  # {owner_id: fraction of growth kept}
+        self._fleets = {}  # {fleet_id: fleet} in view last tick
+        self._unseen = {}  # {planet_id: planet} out of view last tick
+
+    def update(self, tick, planets, fleets, removed=()):
+        ''' Update with the player's view (planets and fleets) of the tick, if
+            tracking. `removed` are the ids of fleets that left the game (not
+            just the view) this tick, which are not ghosts.
+        '''
+        if not self.tracking:
+            return
+        # measure the growth kept by the owners of planets back in view
+        ghost_dests = {f.dest.id for f in self.ghosts.values()}
+        for k, old in self._unseen.items():
+            new = planets[k]
+            if new.vision_age == 0 and new.owner_id == old.owner_id != NEUTRAL_ID:
+                age = old.vision_age + 1
+                if new.growth_rate and k not in ghost_dests:
+                    kept = (new.num_ships - old.num_ships) / float(new.growth_rate * age)
+                    kept = min(max(kept, -1.0), 1.0)
+                    self.kept[new.owner_id] += self.RATE * (kept - self.kept[new.owner_id])
+        self._unseen = {k: p for k, p in planets.items() if p.vision_age}
+        ghosts = self.ghosts
+        for k, f in self._fleets.items():
+            if k not in fleets and k not in removed and f.arrival_tick > tick:
+                ghosts[k] = f
+        for k in fleets:
+            ghosts.pop(k, None)
+        # forget ghosts that arrived at a planet that has been seen since
+        for k, f in list(ghosts.items()):
+            if f.arrival_tick <= tick - planets[f.dest.id].vision_age:
+                del ghosts[k]
+        self._fleets = dict(fleets)
+
+    def estimates(self, tick, planets):
+        ''' Return {planet_id: Estimate} of the likely state of each planet. '''
+        arrivals = defaultdict(lambda: defaultdict(list))  # {planet_id: {tick: [fleets]}}
+        for f in self.ghosts.values():
+            if f.arrival_tick <= tick:
+                arrivals[f.dest.id][f.arrival_tick].append(f)
+        result = {}
+        for k, p in planets.items():
+            if p.vision_age == 0:
+                result[k] = Estimate(p.owner_id, p.num_ships)
+            else:
+                result[k] = self._project(p, tick - p.vision_age, tick, arrivals.get(k, {}))
+        return result
+
+    def _project(self, planet, seen_tick, tick, arrivals):
+        ''' Play out growth and fleet arrivals at a planet since it was seen. '''
+        owner_id, num_ships = planet.owner_id, planet.num_ships
+        for arrival_tick in sorted(arrivals):
+            if owner_id != NEUTRAL_ID:
+                num_ships = max(num_ships + planet.growth_rate * (arrival_tick - seen_tick)
+                                * self.kept[owner_id], 0)
+            seen_tick = arrival_tick
+            forces = defaultdict(int)
+            forces[owner_id] = num_ships
+            for f in arrivals[arrival_tick]:
+                forces[f.owner_id] += f.num_ships
+            if len(forces) > 1:
+                result = sorted([(v, k) for k, v in forces.items()], reverse=True)
+                owner_id = result[0][1]
+                num_ships = result[0][0] - result[1][0]
+            else:
+                num_ships = forces[owner_id]
+        if owner_id != NEUTRAL_ID:
+            num_ships += planet.growth_rate * (tick - seen_tick) * self.kept[owner_id]
+        return Estimate(owner_id, max(num_ships, 0))
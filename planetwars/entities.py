@@ -0,0 +1,226 @@
+"""Game Entities for the PlanetWars world
+
+There are two game entity classes: `Planet` and `Fleet`. Both are derived from
+an `Entity` base class. Conceptually both planets and fleets contain "ships",
+and have a unique game id given to them.
+
+Planets are either "owned" by a player or neutral. When occupied by a player,
+planets create new ships (based on their `growth_rate`). Like fleet positions,
+the ships a planet has grown are worked out from the game `Clock` when needed.
+
+Fleets are launched from a planet (or fleet) and sent to a target planet.
+Fleets are always owned by one of the players. A fleet's position is worked
+out from the game `Clock` (only when it is asked for), so fleets don't need to
+be moved each game step.
+
+"""
+from math import sqrt, ceil
+
+NEUTRAL_ID = 0
+
+
+class Clock(object):
+
+    ''' The current game tick, shared by the game and its entities. '''
+
+    def __init__(self, tick=0):
+        self.tick = tick
+
+
+class Entity(object):
+
+    ''' Abstract class representing entities in the 2d game world.
+        See Fleet and Planet classes.
+    '''
+
+    def __init__(self, id, owner_id, num_ships):
+        self.num_ships = num_ships
+        self.id = id  # type int or uuid
+        self.owner_id = owner_id
+        self.vision_age = 0
+        self.was_battle = False
+        self._name = "%s:%s" % (type(self).__name__, str(id))
+
+    def distance_to(self, other):
+        if self.id == other.id:
+            return 0.0
+        dx = self.x - other.x
+        dy = self.y - other.y
+        return sqrt(dx * dx + dy * dy)
+
+    def remove_ships(self, num_ships):
+        if num_ships <= 0:
+            raise ValueError("Eh! (owner %s) tried to send %d ships (of %d)." %
+                             (self._name, self.owner_id, num_ships, self.num_ships))
+        if self.num_ships < num_ships:
+            raise ValueError("Eh! %s (owner %s) can't remove more ships (%d) then it has (%d)!" %
+                             (self._name, self.owner_id, num_ships, self.num_ships))
+            # num_ships = self.num_ships
+        self.num_ships -= num_ships
+
+    def add_ships(self, num_ships):
+        if num_ships < 0:
+            raise ValueError("Cannot add a negative number of ships...")
+        self.num_ships += num_ships
+
+    def is_in_vision(self):
+        return self.vision_age == 0
+
+    def in_range(self, entities):
+        ''' Returns a list of entity id's that are within vision range of this entity.'''
+        limit = self.vision_range()
+        return [p.id for p in entities if self.distance_to(p) <= limit]
+
+    def __str__(self):
+        return "%s, owner: %s, ships: %d" % (self._name, self.owner_id, self.num_ships)
+
+
+class Planet(Entity):
+
+    ''' A planet in the game world. When occupied by a player, the planet
+        creates new ships each time step. Each planet also has a
+        `vision_range` which is partially proportional to the growth rate
+        (size).
+
+        Planets are not updated each step. Instead the planet remembers the
+        number of ships it had on the tick they were last set, and
+        `num_ships` adds the growth since then (using the `clock`). Setting
+        `num_ships` or `owner_id` "materialises" the ships on the current tick.
+        Game outcomes are the same as adding the growth each step, but (as
+        the growth is added as one `growth_rate * ticks` product) fractional
+        ship counts can differ from that in the float rounding.
+    '''
+    PLANET_RANGE = 5
+    PLANET_FACTOR = 0
+
+    def __init__(self, x, y, id, owner_id, num_ships, growth_rate, clock=None):
+        self.clock = clock or Clock()
+        self._owner_id = owner_id
+        self._battle_tick = None
+        self.x = x
+        self.y = y
+        self.growth_rate = growth_rate
+        super(Planet, self).__init__(id, owner_id, num_ships)
+
+    @property
+    def num_ships(self):
+        if self._owner_id == NEUTRAL_ID:
+            return self._num_ships
+        return self._num_ships + self.growth_rate * (self.clock.tick - self._tick)
+
+    @num_ships.setter
+    def num_ships(self, num_ships):
+        self._num_ships = num_ships
+        self._tick = self.clock.tick
+
+    @property
+    def owner_id(self):
+        return self._owner_id
+
+    @owner_id.setter
+    def owner_id(self, owner_id):
+        # keep the ships grown by the old owner
+        self.num_ships = self.num_ships
+        self._owner_id = owner_id
+
+    @property
+    def was_battle(self):
+        ''' True if there was a battle at the planet in the last step. '''
+        return self._battle_tick == self.clock.tick
+
+    @was_battle.setter
+    def was_battle(self, was_battle):
+        self._battle_tick = self.clock.tick if was_battle else None
+
+    def vision_range(self):
+        ''' The size of the planet will add some vision range with the formula:
+            totalrange = PLANET_RANGE + (planet.growth_rate * PLANET_FACTOR)
+        '''
+        return self.PLANET_RANGE + (self.growth_rate * self.PLANET_FACTOR)
+
+    def copy(self, clock=None):
+        ''' Provides a copy of the Planet instance. The copy has its own clock,
+            stopped at the current tick, unless a `clock` (on the same tick)
+            is given for it to follow.
+        '''
+        p = Planet(self.x, self.y, self.id, self.owner_id, self.num_ships, self.growth_rate,
+                   clock or Clock(self.clock.tick))
+        p.was_battle = self.was_battle
+        return p
+
+
+class Fleet(Entity):
+
+    ''' A fleet in the game world. Each fleet is owned by a player and launched
+        from either a planet or a fleet (mid-flight). All fleets move at the
+        same speed each game step.
+
+        Fleet id values are deliberately obscure (using UUID) to remove any
+        possible value an enemy players might gather from it.
+
+        Rather than being moved each step, a fleet knows the tick it was
+        launched and the tick it will arrive (`arrival_tick`). The `progress`,
+        `turns_remaining` and position (`x`, `y`) are worked out from the
+        current tick of the (shared) `clock` when they are needed.
+    '''
+    FLEET_RANGE = 2
+    # the size of the fleet will add some vision range
+    # with the formula: totalrange = FLEET_RANGE + (fleet.num_ships * FLEET_FACTOR)
+    # todo remove FLEET_FACTOR?
+    FLEET_FACTOR = 0
+
+    def __init__(self, id, owner_id, num_ships, src, dest, progress=0, clock=None):
+        super(Fleet, self).__init__(id, owner_id, num_ships)
+        self.src = src
+        self.dest = dest
+        self.total_trip_length = self.src.distance_to(dest)
+        if self.total_trip_length == 0:
+            raise ValueError("Distance from source to dest is 0?")
+        self.clock = clock or Clock()
+        self.launch_tick = self.clock.tick - progress
+        self.arrival_tick = self.launch_tick + int(ceil(self.total_trip_length))
+        self._pos = None
+        self._pos_tick = None
+
+    @property
+    def progress(self):
+        return self.clock.tick - self.launch_tick
+
+    @property
+    def turns_remaining(self):
+        return self.total_trip_length - self.progress
+
+    @property
+    def x(self):
+        return self.position()[0]
+
+    @property
+    def y(self):
+        return self.position()[1]
+
+    def position(self):
+        ''' The (x, y) position of the fleet at the current clock tick. '''
+        if self._pos_tick != self.clock.tick:
+            src = self.src
+            dest = self.dest
+            scale = 1 - (float(self.turns_remaining) / float(self.total_trip_length))
+            self._pos = (src.x + (dest.x - src.x) * scale, src.y + (dest.y - src.y) * scale)
+            self._pos_tick = self.clock.tick
+        return self._pos
+
+    def in_range(self, entities, ignoredest=True):
+        result = super(Fleet, self).in_range(entities)
+        if (not ignoredest) and (self.turns_remaining == 1) and (self.dest not in result):
+            result.append(self.dest)
+        return result
+
+    def vision_range(self):
+        return self.FLEET_RANGE + (self.num_ships * self.FLEET_FACTOR)
+
+    def copy(self, clock=None):
+        ''' Provides a copy of the Fleet instance, with copies of the src and dest.
+            The copy has its own clock, stopped at the current tick, unless a
+            `clock` (on the same tick) is given for it to follow.
+        '''
+        return Fleet(self.id, self.owner_id, self.num_ships, self.src.copy(), self.dest.copy(),
+                     self.progress, clock or Clock(self.clock.tick))
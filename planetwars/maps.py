@@ -0,0 +1,152 @@
+''' Compiled PlanetWars maps, and planet distance tables.
+
+Ladders, sweeps and servers play many games on the same few maps, so the text
+of each map is only parsed once (per process) into a `GameMap`, which all the
+games on that map then share. Planets never move, so the distances between
+them are also worked out once per map, as a table of
+{planet_id: {planet_id: distance}} (see `GameMap.distances`). The game uses
+the table for planet vision, and bots can use it from `GameInfo.distances`.
+
+Distance tables are computed by one of the `BACKENDS`:
+
+ - "reference": pure Python, the same sums as `Entity.distance_to`
+ - "numpy": vectorized with NumPy (if installed)
+
+Both give exactly the same distances. The default is "numpy" if it is
+installed, else "reference". To choose, call `set_backend(name)` before any
+games are made, or set the PLANETWARS_BACKEND environment variable (which
+worker processes also see).
+
+'''
+import os
+import hashlib
+from math import sqrt
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .entities import NEUTRAL_ID
+
+MAX_MAPS = 256  # compiled maps kept (the cache is cleared when full)
+
+
+def map_hash(gamestate):
+    ''' A short hash of the map (gamestate text), ignoring comments. '''
+    lines = [l.strip() for l in gamestate.split("\n") if l.strip() and l[0] != '#']
+    return hashlib.sha1('\n'.join(lines).encode()).hexdigest()[:12]
+
+
+def _reference_distances(ids, xs, ys):
+    table = {}
+    for a, ax, ay in zip(ids, xs, ys):
+        row = table[a] = {}
+        for b, bx, by in zip(ids, xs, ys):
+            dx = ax - bx
+            dy = ay - by
+            row[b] = sqrt(dx * dx + dy * dy)
+    return table
+
+
+def _numpy_distances(ids, xs, ys):
+    xs = numpy.asarray(xs, dtype=numpy.float64)
+    ys = numpy.asarray(ys, dtype=numpy.float64)
+    dx = xs[:, None] - xs[None, :]
+    dy = ys[:, None] - ys[None, :]
+    rows = numpy.sqrt(dx * dx + dy * dy).tolist()
+    return {a: dict(zip(ids, row)) for a, row in zip(ids, rows)}
+
+
+BACKENDS = {
+    'reference': _reference_distances,
+    'numpy': _numpy_distances,
+}
+
+backend = None  # the name of the backend in use, see set_backend
+
+
+def set_backend(name):
+    ''' Choose the backend ("reference" or "numpy") for distance tables. '''
+    global backend
+    if name not in BACKENDS:
+        raise ValueError("Unknown backend '%s' (use one of %s)." % (name, ', '.join(BACKENDS)))
+    if name == 'numpy' and numpy is None:
+        raise ImportError("The numpy backend needs numpy installed.")
+    backend = name
+
+
+set_backend(os.environ.get('PLANETWARS_BACKEND') or ('numpy' if numpy else 'reference'))
+
+
+def distance_table(planets):
+    ''' Return {planet_id: {planet_id: distance}} between all the planets. '''
+    planets = list(planets)
+    return BACKENDS[backend]([p.id for p in planets], [p.x for p in planets],
+                             [p.y for p in planets])
+
+
+class GameMap(object):
+
+    ''' A parsed gamestate (map) text. Planets are kept as tuples of
+        (x, y, planet_id, owner_id, num_ships, growth_rate) and fleets as
+        tuples of ints (see `PlanetWars._parse_gamestate_text`), in file order.
+        `meta` is the (gameid, player_id, tick, winner) ints of an "M" line,
+        if there is one.
+    '''
+
+    def __init__(self, gamestate):
+        self.hash = map_hash(gamestate)
+        self.planets = []
+        self.fleets = []
+        self.meta = None
+        self.extent = [0, 0, 0, 0]
+        self._distances = None
+        # get the lines, remove comments
+        lines = [l for l in gamestate.split("\n") if (l.strip() != '') and (l[0] != '#')]
+        for line in lines:
+            bits = line.split(" ")
+            if bits[0] == "P":
+                assert len(bits) == 7, "Wrong number of details for Planet"
+                x, y = float(bits[1]), float(bits[2])
+                planet_id, owner_id, num_ships, growth_rate = [int(b) for b in bits[3:]]
+                self.planets.append((x, y, planet_id, owner_id, num_ships, growth_rate))
+                # update extent (area) of map as required
+                extent = self.extent
+                extent[0] = max(extent[0], y + growth_rate)
+                extent[1] = max(extent[1], x + growth_rate)
+                extent[2] = min(extent[2], y - growth_rate)
+                extent[3] = min(extent[3], x - growth_rate)
+            elif bits[0] == "F":
+                assert len(bits) == 8, "Wrong number of details for Fleet"
+                self.fleets.append(tuple(int(b) for b in bits[1:]))  # all ints, pop the "F"
+            elif bits[0] == "M":
+                self.meta = tuple(int(b) for b in bits[1:5])
+            else:
+                assert False, "Eh? Unknown line!"
+        # Each player (seat) is indicated by the owner_id of their home planet(s)
+        self.seats = sorted(set(p[3] for p in self.planets) - {NEUTRAL_ID})
+
+    @property
+    def distances(self):
+        ''' Dict of {planet_id: {planet_id: distance}}, worked out once. '''
+        if self._distances is None:
+            ids = [p[2] for p in self.planets]
+            self._distances = BACKENDS[backend](ids, [p[0] for p in self.planets],
+                                                [p[1] for p in self.planets])
+        return self._distances
+
+
+_maps = {}  # {gamestate: GameMap}
+
+
+def compile_map(gamestate):
+    ''' Return the (shared) `GameMap` of a gamestate text, parsing it only the
+        first time it is seen.
+    '''
+    game_map = _maps.get(gamestate)
+    if game_map is None:
+        if len(_maps) >= MAX_MAPS:
+            _maps.clear()
+        game_map = _maps[gamestate] = GameMap(gamestate)
+    return game_map
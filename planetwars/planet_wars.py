@@ -0,0 +1,395 @@
+from .entities import Clock, Fleet, Planet, NEUTRAL_ID
+from .players import Player
+from collections import defaultdict
+from itertools import chain
+from .logger import Logger
+from .maps import compile_map, distance_table
+
+
+class Changes(object):
+
+    ''' What changed in one game update (the `tick` it started on), as
+        returned by `PlanetWars.update`. Owned planets grow each tick, so
+        growth alone is not listed as a change.
+
+         - planets: ids of planets whose ships changed (launches, arrivals)
+         - owners: {planet_id: (old_owner_id, new_owner_id)}
+         - fleets: ids of fleets whose ships changed (split by a fleet order)
+         - launched: {fleet_id: fleet} of new fleets
+         - gone: {fleet_id: fleet} of fleets that arrived or were emptied
+         - arrived: list of the fleets that arrived at their destination
+         - battles: list of (planet_id, {owner_id: ships}, winner_id)
+
+        A fleet can be both launched and gone in the same update, so apply
+        `launched` before `gone`. The same class describes the changes to a
+        player's view, where `launched` and `gone` are the fleets that came
+        into (or were recopied) and went out of view.
+    '''
+
+    def __init__(self, tick):
+        self.tick = tick
+        self.planets = set()
+        self.owners = {}
+        self.fleets = set()
+        self.launched = {}
+        self.gone = {}
+        self.arrived = []
+        self.battles = []
+
+
+class PlanetWars(object):
+
+    MAX_PLAYERS = 8
+
+    def __init__(self, gamestate=None, logger=None, gameid=0, cfg=None, book=None, metrics=None):
+        # Note: using {} for planets, fleets to support quick "in" test based on id
+        self.planets = {}
+        self.fleets = {}
+        self._arrivals = defaultdict(dict)  # {arrival_tick: {fleet_id: fleet}}
+        self.extent = [0, 0, 0, 0]
+        self.tick = 0
+        self.clock = Clock()  # fleet positions and planet growth follow the clock
+        self.players = {}
+        self.seats = []  # player ids that have a home planet on the map
+        self._planet_mask = None  # cached planet vision, see _visibility
+        self.winner = None
+        self.gameid = gameid
+        self.orders = []
+        self.cfg = cfg
+        self.book = book  # an (optional) OpeningBook for the players
+        self.metrics = metrics  # an (optional) TickMetrics to record each tick
+        self.map = None  # the (shared) GameMap, see maps.py
+        self.map_hash = None
+
+        if gamestate:
+            self._parse_gamestate_text(gamestate)
+        self.logger = logger or Logger('./logs/%s.log')
+        self.turn_log = self.logger.turn
+
+    def add_player(self, name, color=None, params=None, controller=None):
+        ''' Add a player by name, which will be created and contain a
+            controller "bot" loaded from the bot directory. Optional `params`
+            is a dict of bot attribute values to override (for tuning). A
+            ready made `controller` instance can be given instead of loading
+            the bot by name.
+        '''
+        # determine the player id, and get their unique logging function
+        player_id = len(self.players) + 1
+        if player_id not in self.seats:
+            raise ValueError("Map only has seats for %d players." % len(self.seats))
+        log = self.logger.get_player_logger(player_id)
+        # create a new player insance, and tell them about all initial planets
+        self.players[player_id] = Player(player_id, name, color, log, self.cfg, params, controller)
+        self.players[player_id].planets.update(
+            (k, v.copy()) for k, v in self.planets.items())
+        if self.map:
+            self.players[player_id].gameinfo.distances = self.map.distances
+        # and the best opening line for their seat, if there is one
+        if self.book:
+            self.players[player_id].gameinfo.opening = self.book.line(self.map_hash, player_id, name)
+        # todo: check / warn missing home planet for player! (won't get any moves)
+
+    def _parse_gamestate_text(self, gamestate):
+        # the map text is only parsed once (see maps.py), then each game
+        # makes its own planets (and fleets) from the shared GameMap
+        self.map = game_map = compile_map(gamestate)
+        for x, y, planet_id, owner_id, num_ships, growth_rate in game_map.planets:
+            assert 0 <= owner_id <= self.MAX_PLAYERS, "Planet owner is not a valid seat"
+            self.planets[planet_id] = Planet(x, y, planet_id, owner_id, num_ships, growth_rate,
+                                             self.clock)
+        for bits in game_map.fleets:
+            # Fleet(fleet_id, owner_id, num_ships, src.x, src.y, dest_id, progress)
+            f = Fleet(bits[0], bits[1], bits[2], bits[3], bits[4], bits[5], bits[6], self.clock)
+            self._add_fleet(f)
+        if game_map.meta:
+            self.gameid, self.player_id, self.tick, self.winner = game_map.meta
+            self.clock.tick = self.tick
+        self.extent = list(game_map.extent)
+        self.seats = list(game_map.seats)
+        self.map_hash = game_map.hash
+
+    def __str__(self):
+        # todo: this doesn't match the _parse_gamestate_text format anymore
+        s = []
+        s.append("M %d %d %d %d" %
+                 (self.gameid, self.player_id, self.tick, self.winner.id))
+        for p in self.planets:
+            s.append("P %f %f %d %d %d" % (p.x, p.y, p.owner_id, p.num_ships, p.growth_rate))
+        for f in self.fleets:
+            s.append("F %d %d %d %d %d %d" % (f.owner_id, f.num_ships, f.src, f.dest,
+                                              f.total_trip_length, f.turns_remaining))
+        return "\n".join(s)
+
+    def reset(self):
+        # Get ready for first update call
+        planet_vis, fleet_vis = self._visibility()
+        for player in self.players.values():
+            self._sync_player_view(player, planet_vis, fleet_vis)
+
+    def update(self):
+        ''' Play one game step. Returns the `Changes` it made. '''
+        changes = Changes(self.tick)
+        # phase 0, Give each player (controller) a chance to create new fleets
+        for player in self.players.values():
+            player.update()
+        # phase 1, Retrieve and process all pending orders from each player
+        for player in self.players.values():
+            self._process_orders(player, changes)
+        # phase 2 (and 3), Advance the clock, so owned planets grow and all
+        # fleets move, then take the fleets arriving now
+        self.clock.tick = self.tick + 1
+        arrivals = defaultdict(list)
+        for f in self._arrivals.pop(self.clock.tick, {}).values():
+            arrivals[f.dest].append(f)
+        # phase 4, Collate fleet arrivals and planet forces by owner
+        for p, fleets in arrivals.items():
+            changes.planets.add(p.id)
+            forces = defaultdict(int)
+            # add the current occupier of the planet
+            forces[p.owner_id] = p.num_ships
+            # add arriving fleets
+            for f in fleets:
+                del self.fleets[f.id]
+                changes.gone[f.id] = f
+                changes.arrived.append(f)
+                forces[f.owner_id] += f.num_ships
+            # Simple reinforcements?
+            if len(forces) == 1:
+                p.num_ships = forces[p.owner_id]
+            # Battle!
+            else:
+                # There are at least 2 forces, maybe more. Biggest force is winner.
+                # Gap between 1st and 2nd is the remaining force. (The rest cancel each out.)
+                result = sorted([(v, k) for k, v in forces.items()], reverse=True)
+                winner_id = result[0][1]
+                gap_size = result[0][0] - result[1][0]
+                changes.battles.append((p.id, dict(forces), winner_id))
+                if winner_id != p.owner_id:
+                    changes.owners[p.id] = (p.owner_id, winner_id)
+                # Set the new winner
+                p.owner_id = winner_id
+                p.num_ships = gap_size
+                p.was_battle = True
+        # (log any meaningful battle outcomes)
+        self.logger.changes(changes)
+        # phase 5, Update the game tick count (and record metrics)
+        self.tick += 1
+        if self.metrics:
+            self.metrics.record(self)
+        # phase 6, Resync current facade view of the map for each player
+        planet_vis, fleet_vis = self._visibility()
+        for player in self.players.values():
+            self._sync_player_view(player, planet_vis, fleet_vis, changes)
+        return changes
+
+    def _reset_planet_vision(self):
+        ''' Planets never move, so which planets each planet can see never
+            changes. Work it out once, along with a count (by owner) of the
+            planets that can see each planet, and the resulting player mask.
+        '''
+        planets = self.planets.values()
+        distances = self.map.distances if self.map else distance_table(planets)
+        self._planet_sees = {p.id: [k for k, d in distances[p.id].items() if d <= p.vision_range()]
+                             for p in planets}
+        self._planet_seen = {p.id: defaultdict(int) for p in planets}
+        self._planet_mask = dict.fromkeys(self.planets, 0)
+        self._planet_owner = dict.fromkeys(self.planets, NEUTRAL_ID)
+        self._update_planet_vision()
+
+    def _update_planet_vision(self):
+        ''' Keep the planet-derived vision masks up to date with any planets
+            that have changed owner since the last call.
+        '''
+        for p in self.planets.values():
+            old, new = self._planet_owner[p.id], p.owner_id
+            if old == new:
+                continue
+            self._planet_owner[p.id] = new
+            for p_id in self._planet_sees[p.id]:
+                seen = self._planet_seen[p_id]
+                if old != NEUTRAL_ID:
+                    seen[old] -= 1
+                    if seen[old] == 0:
+                        self._planet_mask[p_id] &= ~(1 << old)
+                if new != NEUTRAL_ID:
+                    seen[new] += 1
+                    self._planet_mask[p_id] |= 1 << new
+
+    def _visibility(self):
+        ''' Find which planets / fleets are currently in view, for all players
+            at once. Returns two dicts of {id: mask} for planets and fleets,
+            where bit (1 << player_id) of mask is set if the player can see it.
+
+            Planets seen by planets come from the (cached) planet vision. For
+            the rest, entities are put in a grid of cells (the size of the
+            largest vision range), so each owned planet / fleet only needs to
+            check the entities in the 3x3 cells around it.
+        '''
+        if self._planet_mask is None:
+            self._reset_planet_vision()
+        else:
+            self._update_planet_vision()
+        planet_vis = dict(self._planet_mask)
+        fleet_vis = dict.fromkeys(self.fleets, 0)
+        if not self.fleets:
+            return planet_vis, fleet_vis
+        planets = [p for p in self.planets.values() if p.owner_id != NEUTRAL_ID]
+        fleets = list(self.fleets.values())
+        size = max(e.vision_range() for e in chain(planets, fleets)) or 1.0
+        planet_cells = defaultdict(list)
+        fleet_cells = defaultdict(list)
+        for p in self.planets.values():
+            planet_cells[p.x // size, p.y // size].append(p)
+        for f in fleets:
+            fleet_cells[f.x // size, f.y // size].append(f)
+
+        def mark_in_range(observer, cells, vis):
+            bit = 1 << observer.owner_id
+            limit = observer.vision_range()
+            cx, cy = observer.x // size, observer.y // size
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for e in cells.get((cx + dx, cy + dy), ()):
+                        if observer.distance_to(e) <= limit:
+                            vis[e.id] |= bit
+
+        for p in planets:
+            mark_in_range(p, fleet_cells, fleet_vis)
+        for f in fleets:
+            mark_in_range(f, planet_cells, planet_vis)
+            mark_in_range(f, fleet_cells, fleet_vis)
+        return planet_vis, fleet_vis
+
+    def _sync_player_view(self, player, planet_vis, fleet_vis, changes=None):
+        ''' Resync the player's view of the game. Planets and fleets in view
+            are copies that follow the player's clock (so they grow and move
+            like the real ones), and are only recopied if they have come into
+            view or were changed (see `Changes`). Without `changes`, all in
+            view are recopied.
+        '''
+        bit = 1 << player.id
+        clock = player.clock
+        view = Changes(self.tick)
+        # Increase vision_age of planets that are no longer in view, and stop
+        # them (on the tick they were last seen)
+        for p_id, planet in player.planets.items():
+            if not planet_vis[p_id] & bit:
+                if planet.clock is clock:
+                    planet.clock = Clock(clock.tick)
+                if planet.owner_id == player.id:  # lost planet?
+                    # let player know winner
+                    planet.owner_id = self.planets[p_id].owner_id
+                    view.owners[p_id] = (player.id, planet.owner_id)
+                planet.vision_age += 1
+        player.tick = clock.tick = self.tick
+        # recopy planets in view that are new to the view, or have changed
+        changed = self.planets if changes is None else changes.planets
+        for p_id, planet in player.planets.items():
+            if planet_vis[p_id] & bit and (planet.clock is not clock or p_id in changed):
+                copy = self.planets[p_id].copy(clock)
+                if copy.owner_id != planet.owner_id:
+                    view.owners[p_id] = (planet.owner_id, copy.owner_id)
+                view.planets.add(p_id)
+                player.planets[p_id] = copy
+        # fleets not in view disappear, copy new (or changed) fleets in view
+        fleets = {}
+        for f_id, mask in fleet_vis.items():
+            if mask & bit:
+                f = player.fleets.get(f_id)
+                if f is None or changes is None or f_id in changes.launched or f_id in changes.fleets:
+                    f = view.launched[f_id] = self.fleets[f_id].copy(clock)
+                fleets[f_id] = f
+        view.gone = {k: f for k, f in player.fleets.items() if k not in fleets}
+        player.fleets.clear()
+        player.fleets.update(fleets)
+        # get the player to update their gameinfo with the changes
+        if changes is None:
+            player.refresh_gameinfo()
+        else:
+            player.refresh_gameinfo(view, changes.gone)
+
+    def _process_orders(self, player, changes):
+        ''' Process all pending orders for the player, then clears the orders.
+            An order sends ships from a player-owned fleet or planet to a planet.
+            The launched fleets (and changes to their source) are added to the
+            `changes` of the update.
+
+            Checks for valid order conditions:
+            - Valid source src (planet or fleet)
+            - Valid destination dest (planet only)
+            - Source is owned by player
+            - Source has ships to launch (>0)
+            - Limits number of ships to number available
+
+            Invalid orders are modfied (ship number limit) or ignored.
+        '''
+        player_id = player.id
+        for order in player.orders:
+            o_type, src_id, new_id, num_ships, dest_id = order
+            # Check for valid fleet or planet id?
+            if src_id not in (self.planets.keys() | self.fleets.keys()):
+                self.turn_log("Invalid order ignored - not a valid source.")
+            # Check for valid planet destination?
+            elif dest_id not in self.planets:
+                self.turn_log("Invalid order ignored - not a valid destination.")
+            else:
+                # Extract and use the src and dest details
+                src = self.fleets[src_id] if o_type == 'fleet' else self.planets[src_id]
+                dest = self.planets[dest_id]
+                # Check that player owns the source of ships!
+                if src.owner_id is not player_id:
+                    self.turn_log("Invalid order ignored - player does not own source!")
+                # Is the number of ships requested valid?
+                if num_ships > src.num_ships:
+                    self.turn_log("Invalid order modified - not enough ships. Max used.")
+                    num_ships = src.num_ships
+                # Still ships to launch? Do it ...
+                if num_ships > 0:
+                    # (a fleet launched from a fleet starts from where it is now)
+                    start = src.copy() if o_type == 'fleet' else src
+                    fleet = Fleet(new_id, player_id, num_ships, start, dest, clock=self.clock)
+                    src.remove_ships(num_ships)
+                    if o_type == 'planet':
+                        changes.planets.add(src.id)
+                    # old empty fleet removal (unless replaced by the new fleet)
+                    elif src.num_ships == 0:
+                        self._remove_fleet(src)
+                        if src.id != new_id:
+                            changes.gone[src.id] = src
+                    else:
+                        changes.fleets.add(src.id)
+                    # keep new fleet
+                    self._add_fleet(fleet)
+                    changes.launched[new_id] = fleet
+                    msg = "{0:4d}: Player {1} launched {2} (left {3}) ships from {4} {5} to planet {6}".format(
+                        self.tick, player_id, num_ships, src.num_ships, o_type, src.id, dest.id)
+                    self.turn_log(msg)
+                    player.log(msg)
+                else:
+                    self.turn_log("Invalid order ignored - no ships to launch.")
+        # Done - clear orders.
+        player.orders[:] = []
+
+    def _add_fleet(self, fleet):
+        ''' Keep a fleet, and add it to the bucket of fleets arriving on its
+            arrival tick (so each update only looks at the fleets arriving).
+        '''
+        self.fleets[fleet.id] = fleet
+        self._arrivals[fleet.arrival_tick][fleet.id] = fleet
+
+    def _remove_fleet(self, fleet):
+        ''' Remove a fleet (that hasn't arrived) from the game. '''
+        del self.fleets[fleet.id]
+        bucket = self._arrivals[fleet.arrival_tick]
+        del bucket[fleet.id]
+        if not bucket:
+            del self._arrivals[fleet.arrival_tick]
+
+    def is_alive(self):
+        ''' Return True if two or more players are still alive. '''
+        status = [p for p in self.players.values() if p.is_alive()]
+        if len(status) == 1:
+            self.winner = status[0]
+            return False
+        else:
+            return True
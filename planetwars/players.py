@@ -0,0 +1,365 @@
+import os
+import sys
+import uuid
+import importlib
+from collections import defaultdict
+from .entities import Clock, NEUTRAL_ID
+from .beliefs import Beliefs
+from .maps import distance_table
+
+
+def tick_cached(method):
+    ''' Decorator for derived GameInfo details. The value is computed the
+        first time it is asked for, then kept until the GameInfo is cleared
+        (refreshed) for the next tick.
+    '''
+    name = method.__name__
+
+    def getter(self):
+        try:
+            return self._cache[name]
+        except KeyError:
+            value = self._cache[name] = method(self)
+            return value
+    getter.__doc__ = method.__doc__
+    return property(getter)
+
+
+class GameInfo(object):
+
+    ''' This is the facade of game information given to each "bot" controller
+        each `update` call. It contains the players unique view of the game
+        (limited by fog-of-war).
+
+        It also has bound to it player-specific `log`, `planet_order` and
+        `fleet_order` functions which a bot can call to make notes and issue
+        orders. It is up to the PlanetWars instance to "process" pending orders,
+        and so enforce any required game limits or rules.
+    '''
+    NEUTRAL_ID = NEUTRAL_ID
+
+    def __init__(self, fleet_order, planet_order, logger):
+        # planets
+        self.planets = {}
+        self.neutral_planets = {}
+        self.my_planets = {}
+        self.enemy_planets = {}
+        self.not_my_planets = {}  # == enemy + neutral
+        # fleets
+        self.fleets = {}
+        self.my_fleets = {}
+        self.enemy_fleets = {}
+        # numbers
+        self.tick = 0
+        self.num_ships = 0
+        # derived details (see the tick_cached properties)
+        self._cache = {}
+        # opening book line (if the game has a book), see play_opening
+        self.opening = None
+        # what the player believes about what is out of view, see estimates
+        self.beliefs = Beliefs()
+        # planet distances (given by the game, or worked out when first used)
+        self._distances = None
+        # store helper functions
+        self.fleet_order = fleet_order
+        self.planet_order = planet_order
+        self.log = logger
+
+    def clear(self):
+        self.clear_planets()
+        self.clear_fleets()
+        # numbers
+        self.num_ships = 0
+        # derived details
+        self._cache.clear()
+
+    def clear_planets(self):
+        self.planets.clear()
+        self.neutral_planets.clear()
+        self.my_planets.clear()
+        self.enemy_planets.clear()
+        self.not_my_planets.clear()
+
+    def clear_fleets(self):
+        self.fleets.clear()
+        self.my_fleets.clear()
+        self.enemy_fleets.clear()
+
+    def play_opening(self):
+        ''' Issue this tick's orders from the opening book line for this map
+            and seat, if there is one and it still applies. Returns True if
+            the book was followed (so the bot can skip its own planning).
+        '''
+        orders = self.opening.orders(self) if self.opening else None
+        if orders is None:
+            return False
+        for src_id, dest_id, num_ships in orders:
+            self.planet_order(self.my_planets[src_id], self.planets[dest_id], num_ships)
+        return True
+
+    @staticmethod
+    def _group_by_dest(fleets):
+        result = defaultdict(list)
+        for f in fleets.values():
+            result[f.dest.id].append(f)
+        return dict(result)
+
+    @staticmethod
+    def _total_by_dest(fleets):
+        result = defaultdict(int)
+        for f in fleets.values():
+            result[f.dest.id] += f.num_ships
+        return dict(result)
+
+    @property
+    def distances(self):
+        ''' Dict of {planet_id: {planet_id: distance}} between all planets.
+            Planets never move, so this is the same table (see maps.py) for
+            the whole game, shared with all games on the same map.
+        '''
+        if self._distances is None and self.planets:
+            self._distances = distance_table(self.planets.values())
+        return self._distances
+
+    @distances.setter
+    def distances(self, distances):
+        self._distances = distances
+
+    @tick_cached
+    def fleets_by_dest(self):
+        ''' Dict of {planet_id: [fleets]} of all known fleets, by destination. '''
+        return self._group_by_dest(self.fleets)
+
+    @tick_cached
+    def my_fleets_by_dest(self):
+        ''' Dict of {planet_id: [fleets]} of my fleets, by destination. '''
+        return self._group_by_dest(self.my_fleets)
+
+    @tick_cached
+    def enemy_fleets_by_dest(self):
+        ''' Dict of {planet_id: [fleets]} of known enemy fleets, by destination. '''
+        return self._group_by_dest(self.enemy_fleets)
+
+    @tick_cached
+    def my_incoming_ships(self):
+        ''' Dict of {planet_id: ships} of my fleet ships heading to each planet. '''
+        return self._total_by_dest(self.my_fleets)
+
+    @tick_cached
+    def enemy_incoming_ships(self):
+        ''' Dict of {planet_id: ships} of known enemy ships heading to each planet. '''
+        return self._total_by_dest(self.enemy_fleets)
+
+    @tick_cached
+    def estimates(self):
+        ''' Dict of {planet_id: Estimate(owner_id, num_ships)} of the likely
+            current state of every planet. Planets out of view are projected
+            from when they were last seen, with growth and the arrival of
+            any ghost fleets (see beliefs.py).
+        '''
+        return self._beliefs().estimates(self.tick, self.planets)
+
+    @property
+    def ghost_fleets(self):
+        ''' Dict of {fleet_id: fleet} of fleets that have gone out of view
+            but (probably) haven't yet arrived. Their positions are estimates.
+        '''
+        return self._beliefs().ghosts
+
+    def _beliefs(self):
+        # beliefs are only kept (updated each tick) once a bot uses them
+        if not self.beliefs.tracking:
+            self.beliefs.tracking = True
+            self.beliefs.update(self.tick, self.planets, self.fleets)
+        return self.beliefs
+
+    @tick_cached
+    def nearest_my_planet(self):
+        ''' Dict of {planet_id: planet} of my planet nearest to each planet.
+            (Empty if I have no planets.)
+        '''
+        mine = list(self.my_planets.values())
+        if not mine:
+            return {}
+        distances = self.distances
+        return {k: min(mine, key=lambda p: distances[k][p.id]) for k in self.planets}
+
+
+class Player(object):
+
+    ''' This is used by the actual `PlanetWars` game instance to represent each
+        player, and also finds, creates and contains the "bot" controller
+        instance specified by `name`.
+
+        Each game step `update` the Player instance refreshes the GameInfo
+        instance and passes it to the bot controller, which then issues orders
+        (via the facade). The orders may be ignored if they are invalid.
+
+        The facade details represent a "fog-of-war" view of the true game
+        environment. A player bot can only "see" what is in range of it's own
+        occupied planets or fleets in transit across the map. This creates an
+        incentive for bots to exploit scout details.
+    '''
+
+    def __init__(self, id, name, color, log, cfg, params=None, controller=None):
+        self.id = id  # as allocated by the game
+        self.name = name.replace('.py', '')  # accept both "Dumbo" or "Dumbo.py"
+        self.color = color  # if others want to know
+        self.cfg = cfg  # nice to know details
+        self.log = log or (lambda *p, **kw: None)
+        self.gameinfo = GameInfo(self.fleet_order, self.planet_order, self.log)
+        self.orders = []
+        self.planets = {}  # our copy of all planets (known and unknown)
+        self.fleets = {}  # our copy of all fleets we know about
+        self.clock = Clock()  # (copies in view follow this clock)
+        self.num_ships = 0
+
+        # Create a controller object based on the name (unless given one)
+        # - Look for a ./bots/BotName.py module (file) we need
+        if controller is None:
+            mod = __import__('bots.' + name)  # ... the top level bots mod (dir)
+            mod = getattr(mod, name)       # ... then the bot mod (file)
+            cls = getattr(mod, name)      # ... the class (eg DumBo.py contains DumBo class)
+            controller = cls()
+        self.controller = controller
+        # Override any of the bot's tunable parameters (class attributes)
+        for key, value in (params or {}).items():
+            if not hasattr(self.controller, key):
+                raise AttributeError("%s has no parameter '%s'" % (name, key))
+            setattr(self.controller, key, value)
+
+    def __str__(self):
+        return "%s(id=%s)" % (self.name, str(self.id))
+
+    def refresh_gameinfo(self, changes=None, removed=()):
+        ''' Update the player's view (facade) of planets/fleets. If the
+            `changes` to the view are given (see `Changes` in planet_wars.py),
+            only what has changed is updated. `removed` are the ids of fleets
+            that left the game (rather than just the view) this update.
+        '''
+        gameinfo = self.gameinfo
+        gameinfo.tick = self.tick
+        gameinfo._cache.clear()
+        # set planet details (swap in changed planets if none changed owner)
+        if changes is None or changes.owners:
+            gameinfo.clear_planets()
+            gameinfo.planets.update(self.planets)
+            gameinfo.neutral_planets.update(self._neutral_planets())
+            gameinfo.my_planets.update(self._my_planets())
+            gameinfo.enemy_planets.update(self._enemy_planets())
+            gameinfo.not_my_planets.update(self._not_my_planets())
+        else:
+            groups = (gameinfo.planets, gameinfo.neutral_planets, gameinfo.my_planets,
+                      gameinfo.enemy_planets, gameinfo.not_my_planets)
+            for k in changes.planets:
+                for planets in groups:
+                    if k in planets:
+                        planets[k] = self.planets[k]
+        # set fleet details (if any are new, or gone)
+        if changes is None or changes.launched or changes.gone:
+            gameinfo.clear_fleets()
+            gameinfo.fleets.update(self.fleets)
+            gameinfo.my_fleets.update(self._my_fleets())
+            gameinfo.enemy_fleets.update(self._enemy_fleets())
+        # keep track of what has gone out of view
+        gameinfo.beliefs.update(self.tick, self.planets, self.fleets, removed)
+        # update total number of ships we have
+        total = sum([p.num_ships for p in self.gameinfo.my_planets.values()])
+        total += sum([f.num_ships for f in self.gameinfo.my_fleets.values()])
+        self.num_ships = self.gameinfo.num_ships = total
+
+    def update(self):
+        # Assumes gameinfo facade details are ready - let the bot issue orders!
+        # Note: the bot controller has a reference to our *_order methods.
+        self.controller.update(self.gameinfo)
+
+    def is_alive(self):
+        return self.num_ships > 0
+
+    def fleet_order(self, src_fleet, dest, num_ships):
+        ''' Order fleet to divert (some/all) fleet ships to a destination planet.
+            Note: this is just a request for it to be done, and fleetid is our reference
+            if it is done, but no guarantee - the game decides and enforces the rules.
+        '''
+        # If source fleet splitting we'll need a new fleet_id else keep old one
+        fleetid = uuid.uuid4() if num_ships < src_fleet.num_ships else src_fleet.id
+        self.orders.append(('fleet', src_fleet.id, fleetid, num_ships, dest.id))
+        return fleetid
+
+    def planet_order(self, src_planet, dest, num_ships):
+        ''' Order planet to launch a new fleet to the destination planet.
+            Note: this is just a request for it to be done, and fleetid is our reference
+            if it is done, but no guarantee - the game decides and enforces the rules.
+        '''
+        fleetid = uuid.uuid4()
+        self.orders.append(('planet', src_planet.id, fleetid, num_ships, dest.id))
+        return fleetid
+
+    def _my_planets(self):
+        return [(k, p) for k, p in self.planets.items() if p.owner_id == self.id]
+
+    def _enemy_planets(self):
+        return [(k, p) for k, p in self.planets.items() if p.owner_id not in (NEUTRAL_ID, self.id)]
+
+    def _not_my_planets(self):
+        return [(k, p) for k, p in self.planets.items() if p.owner_id != self.id]
+
+    def _neutral_planets(self):
+        return [(k, p) for k, p in self.planets.items() if p.owner_id == NEUTRAL_ID]
+
+    def _my_fleets(self):
+        return [(k, f) for k, f in self.fleets.items() if f.owner_id == self.id]
+
+    def _enemy_fleets(self):
+        return [(k, f) for k, f in self.fleets.items() if f.owner_id != self.id]
+
+
+class BotReloader(object):
+
+    ''' Hot reload of the bot modules (./bots/*.py) used by players. Call
+        `check` each tick (before the game update) - any bot module file that
+        has been modified since is reloaded, and the class of each controller
+        from that module is swapped for the new class. The controller
+        instance, and so any state it keeps, stays the same. Files are
+        watched by polling their modified time, which is cheap.
+
+        If a module fails to reload (a syntax error, say) the error is logged
+        to the player and the old class is kept.
+    '''
+
+    def __init__(self, players):
+        self.players = list(players)
+        self._mtimes = {name: self._mtime(name) for name in self._modules()}
+
+    def _modules(self):
+        names = set(type(p.controller).__module__ for p in self.players)
+        return [name for name in names if name.startswith('bots.')]
+
+    @staticmethod
+    def _mtime(name):
+        try:
+            return os.stat(sys.modules[name].__file__).st_mtime
+        except OSError:
+            return None
+
+    def check(self):
+        ''' Reload modified bot modules. Returns the names of those reloaded. '''
+        reloaded = []
+        for name, mtime in self._mtimes.items():
+            new_mtime = self._mtime(name)
+            if new_mtime == mtime:
+                continue
+            self._mtimes[name] = new_mtime
+            players = [p for p in self.players if type(p.controller).__module__ == name]
+            try:
+                module = importlib.reload(sys.modules[name])
+                for p in players:
+                    p.controller.__class__ = getattr(module, type(p.controller).__name__)
+            except Exception as e:
+                for p in players:
+                    p.log("Reload of %s failed (%s: %s)" % (name, type(e).__name__, e))
+                continue
+            for p in players:
+                p.log("Reloaded %s" % name)
+            reloaded.append(name)
+        return reloaded